@@ -0,0 +1,109 @@
+import hashlib
+import os
+import threading
+import time
+
+import config
+import db
+from metadata_cache import cache_key
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS downloads (
+    video_key TEXT NOT NULL,
+    format TEXT NOT NULL,
+    codec TEXT NOT NULL,
+    path TEXT,
+    finished_at REAL NOT NULL,
+    PRIMARY KEY (video_key, format, codec)
+);
+CREATE TABLE IF NOT EXISTS hashes (
+    sha256 TEXT NOT NULL,
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS hashes_sha256 ON hashes (sha256);
+"""
+
+HASH_CHUNK = 1024 * 1024
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def job_formats(job):
+    # A job is archived under the selector it was submitted with ('bestaudio/best',
+    # ...) as well as the format it resolved to, so re-running the same batch
+    # list matches without resolving anything
+    formats = {job.format_selector, job.format_id, job.requested_format}
+    formats.discard(None)
+    return formats
+
+
+class DownloadArchive:
+    def __init__(self, path=config.ARCHIVE_DB, hash_files=config.ARCHIVE_HASH):
+        self.path = path
+        self.hash_files = hash_files
+        self._lock = threading.Lock()
+        self._conn = db.connect(path)
+        self._conn.executescript(SCHEMA)
+        # Lookups are served from memory; the table is only read once
+        self._keys = set(self._conn.execute('SELECT video_key, format, codec FROM downloads'))
+
+    def contains(self, url, format_selector, codec):
+        return (cache_key(url), format_selector, codec) in self._keys
+
+    def missing_filetypes(self, job):
+        return [filetype for filetype in job.filetypes
+                if not self.contains(job.url, job.format_selector, filetype)]
+
+    def add(self, job, targets):
+        video_key = cache_key(job.url)
+        rows = [(video_key, format_key, codec, path, time.time())
+                for path, codec in targets for format_key in job_formats(job)]
+        with self._lock:
+            self._conn.executemany('INSERT OR REPLACE INTO downloads VALUES (?, ?, ?, ?, ?)', rows)
+            self._keys.update(row[:3] for row in rows)
+        # Returns the library files that already held the same audio
+        duplicates = []
+        if self.hash_files:
+            for path, codec in targets:
+                duplicate = self.index_file(path)
+                if duplicate:
+                    duplicates.append(duplicate)
+        return duplicates
+
+    def index_file(self, path):
+        # Returns another indexed file with the same content, or None
+        sha256 = file_sha256(path)
+        with self._lock:
+            row = self._conn.execute('SELECT path FROM hashes WHERE sha256 = ? AND path != ? LIMIT 1',
+                                     (sha256, path)).fetchone()
+            self._conn.execute('INSERT OR REPLACE INTO hashes (sha256, path, size) VALUES (?, ?, ?)',
+                               (sha256, path, os.path.getsize(path)))
+        return row[0] if row else None
+
+    def index_library(self, directory):
+        # Hashes files that were not produced by this app, e.g. an existing music folder
+        with self._lock:
+            known = {path for path, in self._conn.execute('SELECT path FROM hashes')}
+        count = 0
+        for root, _, names in os.walk(directory):
+            for name in names:
+                path = os.path.join(root, name)
+                if path not in known:
+                    self.index_file(path)
+                    count += 1
+        return count
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_archive():
+    return DownloadArchive() if config.ARCHIVE else None
@@ -0,0 +1,91 @@
+import re
+import threading
+import time
+
+import config
+from download_job import HIGH, NORMAL, LOW
+
+# Share of the bandwidth cap relative to the other running jobs
+PRIORITY_WEIGHTS = {HIGH: 8, NORMAL: 2, LOW: 1}
+
+_RATE_RE = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([kmg]?)(?:i?b)?(?:/s)?\s*$', re.IGNORECASE)
+_RATE_UNITS = {'': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3}
+
+
+def parse_rate(text):
+    # '500K', '2M', '1.5MiB/s' or plain bytes per second; 0 means no limit
+    match = _RATE_RE.match(text)
+    if not match:
+        raise ValueError(f"invalid rate: {text!r}")
+    return int(float(match.group(1)) * _RATE_UNITS[match.group(2).lower()])
+
+
+class BandwidthScheduler:
+    # Token bucket shared by every download. The cap is split between the jobs
+    # that are downloading in proportion to their priority weights; each job
+    # has its own bucket refilled at its share and may bank up to BURST seconds
+    # of it. Downloads are slowed by sleeping in their progress callbacks, which
+    # yt-dlp and the chunked downloader call after every block they read.
+
+    BURST = 0.5
+
+    def __init__(self, rate=config.BANDWIDTH_LIMIT):
+        self._rate = rate  # bytes per second, 0 for unlimited
+        self._jobs = {}  # job_id -> [weight, bytes seen so far, time the bucket is empty until]
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+
+    @property
+    def rate(self):
+        return self._rate
+
+    def set_rate(self, rate):
+        # Takes effect immediately, also for callbacks that are already waiting
+        with self._changed:
+            self._rate = max(int(rate), 0)
+            now = time.monotonic()
+            for state in self._jobs.values():
+                state[2] = now
+            self._changed.notify_all()
+
+    def start(self, job):
+        with self._lock:
+            self._jobs[job.job_id] = [PRIORITY_WEIGHTS.get(job.priority, PRIORITY_WEIGHTS[NORMAL]), None,
+                                      time.monotonic()]
+
+    def stop(self, job):
+        with self._changed:
+            self._jobs.pop(job.job_id, None)
+            self._changed.notify_all()
+
+    def set_priority(self, job, priority):
+        job.priority = priority
+        with self._changed:
+            state = self._jobs.get(job.job_id)
+            if state is not None:
+                state[0] = PRIORITY_WEIGHTS[priority]
+                state[2] = time.monotonic()
+                self._changed.notify_all()
+
+    def account(self, job, downloaded):
+        # Called with a job's running byte count; blocks until its share allows the new bytes
+        with self._changed:
+            state = self._jobs.get(job.job_id)
+            if state is None or downloaded is None:
+                return
+            previous = state[1]
+            # Parallel connections may report slightly out of order
+            if previous is not None and downloaded <= previous:
+                return
+            state[1] = downloaded
+            # The first count may include a resumed .part file
+            if previous is None or not self._rate:
+                return
+            received = downloaded - previous
+            share = self._rate * state[0] / sum(other[0] for other in self._jobs.values())
+            now = time.monotonic()
+            state[2] = max(state[2], now - self.BURST) + received / share
+            delay = state[2] - now
+            if delay > 0:
+                # Woken early when the cap or the priorities change
+                self._changed.wait(delay)
@@ -0,0 +1,70 @@
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Extraction latency with a cold yt-dlp cache (fresh cache directory every run)
+# versus a warm one (cache directory kept between runs). Needs network access.
+#
+#   python benchmarks/bench_cache.py -n 5 https://www.youtube.com/watch?v=jNQXAC9IVRw
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Each run is a fresh process so nothing is memoized in memory between runs;
+# only the time spent in extract_info is reported
+CHILD = r'''
+import sys, time
+sys.path.insert(0, sys.argv[1])
+from yt_dlp import YoutubeDL
+import engine
+opts = engine.ydl_options(**engine.RESOLVE_OPTS)
+opts['cachedir'] = sys.argv[2]
+with YoutubeDL(opts) as ydl:
+    start = time.perf_counter()
+    ydl.extract_info(sys.argv[3], download=False)
+    print(time.perf_counter() - start)
+'''
+
+
+def extract(cache_dir, url):
+    env = dict(os.environ, YTL_METADATA_STORE='0')  # the metadata store would skip extraction entirely
+    result = subprocess.run([sys.executable, '-c', CHILD, ROOT, cache_dir, url], capture_output=True,
+                            text=True, env=env)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip())
+    return float(result.stdout.strip().splitlines()[-1]) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare extraction latency with a cold and a warm yt-dlp cache.")
+    parser.add_argument('url')
+    parser.add_argument('-n', '--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    cold = []
+    for _ in range(args.runs):
+        cache_dir = tempfile.mkdtemp(prefix='ytl-cold-')
+        try:
+            cold.append(extract(cache_dir, args.url))
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+    warm_dir = tempfile.mkdtemp(prefix='ytl-warm-')
+    try:
+        extract(warm_dir, args.url)  # fills the cache
+        warm = [extract(warm_dir, args.url) for _ in range(args.runs)]
+    finally:
+        shutil.rmtree(warm_dir, ignore_errors=True)
+
+    for name, timings in (('cold', cold), ('warm', warm)):
+        print(f"{name}: median {statistics.median(timings):.0f} ms, min {min(timings):.0f} ms, "
+              f"max {max(timings):.0f} ms ({args.runs} runs)")
+    print(f"warm cache saves {statistics.median(cold) - statistics.median(warm):.0f} ms per extraction")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
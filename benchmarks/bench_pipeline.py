@@ -0,0 +1,167 @@
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+# End-to-end pipeline benchmark that runs without network access. A local media
+# server (media_server.py) serves generated audio with range support and a per
+# connection rate limit, and a stub yt-dlp extractor (plugins/yt_dlp_plugins)
+# returns canned info dicts pointing at it. Reports time-to-formats, download
+# throughput, transcode time and end-to-end jobs per minute through the engine
+# that the GUI and the CLI use.
+#
+#   python benchmarks/bench_pipeline.py --jobs 12 --rate 2M --json results.json
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+PLUGINS = os.path.join(BENCH_DIR, 'plugins')
+
+
+def isolate(scratch):
+    # Must run before the first import of config: fresh caches, nothing persisted
+    os.environ.update({
+        'XDG_CACHE_HOME': os.path.join(scratch, 'cache'),
+        'XDG_DATA_HOME': os.path.join(scratch, 'data'),
+        'YTL_SCRATCH_DIR': os.path.join(scratch, 'work'),
+        'YTL_METADATA_STORE': '0',
+        'YTL_JOURNAL': '0',
+        'YTL_ARCHIVE': '0',
+    })
+    sys.path[:0] = [ROOT, PLUGINS, BENCH_DIR]
+
+
+def megabytes(count):
+    return count / (1024 * 1024)
+
+
+def time_to_formats(engine, args, results):
+    # The first lookup pays for importing yt-dlp and creating a session
+    timings = []
+    for index in range(args.lookups):
+        start = time.perf_counter()
+        info = engine.resolve(f'ytl-stub:lookup{index}-{args.seconds}')
+        engine.audio_streams(info)
+        timings.append((time.perf_counter() - start) * 1000)
+    results['time_to_formats_first_ms'] = timings[0]
+    results['time_to_formats_median_ms'] = statistics.median(timings[1:] or timings)
+    print(f"time to formats: first {timings[0]:.0f} ms, then median {results['time_to_formats_median_ms']:.0f} ms "
+          f"({args.lookups} lookups)", flush=True)
+
+
+def download_throughput(engine, args, scratch, results):
+    from download_job import DownloadJob
+    for label, connections in (('1 connection', 1), ('auto connections', 0)):
+        url = f'ytl-stub:download{connections}-{args.seconds}'
+        save_path = tempfile.mkdtemp(dir=scratch)
+        job = DownloadJob(url, engine.resolve(url), None, ['wav'], save_path, format_selector='wav-44k',
+                          connections=connections)
+        start = time.perf_counter()
+        path = engine.download_source(job, lambda progress: None)
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(path)
+        key = 'download_single_mb_s' if connections == 1 else 'download_auto_mb_s'
+        results[key] = megabytes(size) / elapsed
+        print(f"download ({label}): {megabytes(size):.1f} MiB in {elapsed:.2f} s, {results[key]:.2f} MiB/s",
+              flush=True)
+        if connections:
+            source = path
+        else:
+            os.remove(path)
+    return source
+
+
+def transcode_times(args, source, scratch, results):
+    import config
+    from format_select import REENCODE, conversion
+    from transcoder import CODEC_ARGS, transcode
+    if shutil.which(config.FFMPEG) is None:
+        print(f"transcode: skipped, {config.FFMPEG} not found (set YTL_FFMPEG)", flush=True)
+        return
+    for filetype in CODEC_ARGS:
+        if conversion('pcm_s16le', filetype) != REENCODE:
+            continue  # a rename, nothing to measure
+        target = os.path.join(scratch, f'transcode.{filetype}')
+        start = time.perf_counter()
+        transcode(source, [(target, filetype)], 'pcm_s16le')
+        elapsed = time.perf_counter() - start
+        os.remove(target)
+        results[f'transcode_{filetype}_ms'] = elapsed * 1000
+        print(f"transcode {filetype}: {elapsed * 1000:.0f} ms ({args.seconds / elapsed:.0f}x realtime)", flush=True)
+
+
+def end_to_end(engine, args, scratch, results):
+    from download_job import DownloadJob
+    save_path = tempfile.mkdtemp(dir=scratch)
+    manager = engine.DownloadManager(args.workers, stream_encode=args.stream)
+    start = time.perf_counter()
+    jobs = []
+    for index in range(args.jobs):
+        url = f'ytl-stub:job{index}-{args.seconds}'
+        jobs.append(manager.submit(DownloadJob(url, engine.resolve(url), None, [args.type], save_path,
+                                               format_selector='wav-44k')))
+    manager.wait()
+    elapsed = time.perf_counter() - start
+    manager.shutdown()
+
+    failed = [job for job in jobs if job.state != 'done']
+    for job in failed:
+        print(f"  job {job.job_id} {job.state}: {job.error}", file=sys.stderr)
+    results['jobs_per_minute'] = (len(jobs) - len(failed)) / elapsed * 60
+    results['end_to_end_failed'] = len(failed)
+    print(f"end to end: {len(jobs)} jobs ({args.type}, {args.workers} workers"
+          f"{', streamed' if args.stream else ''}) in {elapsed:.1f} s, "
+          f"{results['jobs_per_minute']:.1f} jobs/min" + (f", {len(failed)} failed" if failed else ""), flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark lookup, download, transcode and whole jobs offline.")
+    parser.add_argument('--seconds', type=int, default=180, help="length of each generated track (default: 180)")
+    parser.add_argument('--rate', default='2M', help="per connection server limit, 0 for none (default: 2M)")
+    parser.add_argument('--latency', type=float, default=50, help="page latency of the stub site in ms (default: 50)")
+    parser.add_argument('--lookups', type=int, default=10, help="lookups for time-to-formats (default: 10)")
+    parser.add_argument('--jobs', type=int, default=12, help="jobs for the end-to-end run (default: 12)")
+    parser.add_argument('--workers', type=int, default=3, help="concurrent downloads (default: 3)")
+    parser.add_argument('--stream', action='store_true', help="pipe the end-to-end downloads into ffmpeg")
+    parser.add_argument('--type', help="output file type of the end-to-end jobs (default: mp3, wav without ffmpeg)")
+    parser.add_argument('--json', metavar='FILE', help="also write the results to FILE")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix='ytl-bench-')
+    isolate(scratch)
+    try:
+        from media_server import MediaServer
+        from bandwidth import parse_rate
+        server = MediaServer(rate=parse_rate(args.rate), latency=args.latency / 1000).start()
+        os.environ['YTL_BENCH_SERVER'] = server.url  # read by the stub extractor
+        import config
+        import engine
+        if args.type is None:
+            args.type = 'mp3' if shutil.which(config.FFMPEG) else 'wav'
+
+        results = {'seconds': args.seconds, 'rate': args.rate, 'latency_ms': args.latency}
+        time_to_formats(engine, args, results)
+        source = download_throughput(engine, args, scratch, results)
+        transcode_times(args, source, scratch, results)
+        end_to_end(engine, args, scratch, results)
+        from metrics import metrics
+        results['stages'] = metrics.summary()
+        for stage, totals in results['stages'].items():
+            print(f"  {stage}: {totals['count']} spans, {totals['seconds'] / totals['count'] * 1000:.0f} ms on average",
+                  flush=True)
+        results['server_requests'] = server.requests
+        server.shutdown()
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 1 if results['end_to_end_failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,83 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Time from launching a fresh interpreter to the main window's first paint.
+# Runs headless on the offscreen Qt platform unless QT_QPA_PLATFORM is set.
+#
+#   python benchmarks/bench_startup.py -n 10 --max-ms 1500
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Mirrors the GUI branch of yt-to-local.py, plus a paint probe
+CHILD = r'''
+import sys
+sys.path.insert(0, sys.argv[1])
+from PyQt6.QtCore import QEvent, QObject
+from PyQt6.QtWidgets import QApplication
+from main_window import YouTubeDownloader
+
+class FirstPaint(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint:
+            print("painted", 'yt_dlp' in sys.modules, flush=True)
+            app.exit(0)
+        return False
+
+app = QApplication(sys.argv[:1])
+window = YouTubeDownloader()
+probe = FirstPaint()
+window.installEventFilter(probe)
+window.show()
+sys.exit(app.exec())
+'''
+
+
+def measure(env):
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-c', CHILD, ROOT], stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL, text=True, env=env)
+    for line in process.stdout:
+        if line.startswith('painted'):
+            elapsed = time.perf_counter() - start
+            process.wait()
+            return elapsed, line.split()[1] == 'True'
+    process.wait()
+    raise RuntimeError(f"window never painted (exit status {process.returncode})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure time to first paint of the main window.")
+    parser.add_argument('-n', '--runs', type=int, default=5)
+    parser.add_argument('--xml-ui', action='store_true', help="build the window from main.ui instead of ui_main.py")
+    parser.add_argument('--max-ms', type=float, help="exit with status 1 if the median exceeds this")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    if args.xml_ui:
+        env['YTL_UI_FROM_XML'] = '1'
+
+    measure(env)  # warm the OS file cache so runs are comparable
+    timings = []
+    eager = False
+    for _ in range(args.runs):
+        elapsed, ytdlp_loaded = measure(env)
+        timings.append(elapsed * 1000)
+        eager = eager or ytdlp_loaded
+
+    median = statistics.median(timings)
+    print(f"first paint: median {median:.0f} ms, min {min(timings):.0f} ms, max {max(timings):.0f} ms ({args.runs} runs)")
+    if eager:
+        print("warning: yt_dlp was imported before the first paint")
+    if args.max_ms is not None and median > args.max_ms:
+        print(f"regression: median {median:.0f} ms exceeds {args.max_ms:.0f} ms")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
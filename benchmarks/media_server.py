@@ -0,0 +1,149 @@
+import argparse
+import http.server
+import math
+import os
+import re
+import struct
+import sys
+import threading
+import time
+from urllib.parse import urlparse, parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bandwidth import parse_rate
+
+# Local HTTP server for the offline benchmarks. Serves generated WAV files with
+# byte range support and an optional per-connection rate limit, so downloads
+# behave like a throttled CDN without touching the network.
+#
+#   /audio/<seconds>s-<sample rate>-<channels>ch.wav   e.g. /audio/180s-44100-2ch.wav
+#   /watch/<id>   a small page the stub extractor fetches, answered after --latency ms
+#
+#   python benchmarks/media_server.py --port 8765 --rate 512K
+
+PATH_RE = re.compile(r'^/audio/(\d+)s-(\d+)-([12])ch\.wav$')
+WATCH_PAGE = b'<html><head><title>stub</title></head><body>' + b'x' * 64 * 1024 + b'</body></html>'
+SEND_SIZE = 16 * 1024
+
+
+def generate_wav(seconds, sample_rate, channels):
+    # A 440 Hz tone; one second is generated and repeated, which keeps startup fast
+    period = [int(12000 * math.sin(2 * math.pi * 440 * n / sample_rate)) for n in range(sample_rate)]
+    second = struct.pack(f'<{sample_rate * channels}h', *(value for value in period for _ in range(channels)))
+    data_size = len(second) * seconds
+    header = struct.pack('<4sI4s4sIHHIIHH4sI', b'RIFF', 36 + data_size, b'WAVE', b'fmt ', 16, 1, channels,
+                         sample_rate, sample_rate * channels * 2, channels * 2, 16, b'data', data_size)
+    return header + second * seconds
+
+
+class MediaHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like a real CDN
+
+    def do_HEAD(self):
+        self.respond(send_body=False)
+
+    def do_GET(self):
+        self.respond(send_body=True)
+
+    def respond(self, send_body):
+        if urlparse(self.path).path.startswith('/watch/'):
+            self.watch_page(send_body)
+            return
+        match = PATH_RE.match(urlparse(self.path).path)
+        if not match:
+            self.send_error(404)
+            return
+        data = self.server.media(*(int(group) for group in match.groups()))
+        rate = int(parse_qs(urlparse(self.path).query).get('rate', [self.server.rate])[0])
+
+        start, end = 0, len(data) - 1
+        range_header = self.headers.get('Range')
+        if range_header:
+            first, _, last = range_header.partition('=')[2].partition('-')
+            start = int(first)
+            end = min(int(last), len(data) - 1) if last else end
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{len(data)}')
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', 'audio/wav')
+        self.send_header('Content-Length', str(end - start + 1))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.end_headers()
+        self.server.requests += 1
+        if send_body:
+            self.send_body(data, start, end, rate)
+
+    def watch_page(self, send_body):
+        # Stands in for the page an extractor downloads before it knows the formats
+        time.sleep(self.server.latency)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(WATCH_PAGE)))
+        self.end_headers()
+        self.server.requests += 1
+        if send_body:
+            self.wfile.write(WATCH_PAGE)
+
+    def send_body(self, data, start, end, rate):
+        started = time.monotonic()
+        sent = 0
+        try:
+            for offset in range(start, end + 1, SEND_SIZE):
+                block = data[offset:min(offset + SEND_SIZE, end + 1)]
+                self.wfile.write(block)
+                sent += len(block)
+                if rate:
+                    ahead = sent / rate - (time.monotonic() - started)
+                    if ahead > 0:
+                        time.sleep(ahead)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MediaServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0, rate=0, latency=0.0):
+        super().__init__(('127.0.0.1', port), MediaHandler)
+        self.rate = rate  # bytes per second per connection, 0 for unlimited
+        self.latency = latency  # seconds before a watch page is answered
+        self.requests = 0
+        self._media = {}
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def media(self, seconds, sample_rate, channels):
+        key = (seconds, sample_rate, channels)
+        with self._lock:
+            if key not in self._media:
+                self._media[key] = generate_wav(*key)
+            return self._media[key]
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name='media-server', daemon=True).start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve generated WAV files with range support and throttling.")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--rate', type=parse_rate, default=0, help="per connection limit, e.g. 512K (default: none)")
+    parser.add_argument('--latency', type=float, default=0, help="watch page delay in ms (default: 0)")
+    args = parser.parse_args()
+    server = MediaServer(args.port, args.rate, args.latency / 1000)
+    print(f"Serving on {server.url}/audio/180s-44100-2ch.wav", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
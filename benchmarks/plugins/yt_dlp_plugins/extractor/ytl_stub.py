@@ -0,0 +1,49 @@
+import os
+import time
+
+from yt_dlp.extractor.common import InfoExtractor
+
+# Stub extractor for the offline benchmarks. Loaded by yt-dlp's plugin system
+# when benchmarks/plugins is on sys.path. It fetches a stand-in watch page from
+# benchmarks/media_server.py (at YTL_BENCH_SERVER) and returns a canned info dict
+# in the shape YoutubeIE produces, with audio formats served by that server.
+#
+#   ytl-stub:<id>-<seconds>   e.g. ytl-stub:track1-180
+
+FORMATS = (
+    # format_id, sample rate, channels
+    ('wav-44k', 44100, 2),
+    ('wav-22k', 22050, 1),
+)
+
+
+class YtlStubIE(InfoExtractor):
+    IE_NAME = 'ytl-stub'
+    _VALID_URL = r'ytl-stub:(?P<id>[\w-]+)-(?P<seconds>\d+)$'
+
+    def _real_extract(self, url):
+        video_id, seconds = self._match_valid_url(url).group('id', 'seconds')
+        seconds = int(seconds)
+        server = os.environ.get('YTL_BENCH_SERVER', 'http://127.0.0.1:8765')
+        self._download_webpage(f'{server}/watch/{video_id}', video_id)
+
+        # Signed like googlevideo URLs, so metadata expiry is exercised too
+        expire = int(time.time()) + 6 * 60 * 60
+        formats = [{
+            'format_id': format_id,
+            'url': f'{server}/audio/{seconds}s-{sample_rate}-{channels}ch.wav?id={video_id}&expire={expire}',
+            'ext': 'wav',
+            'acodec': 'pcm_s16le',
+            'vcodec': 'none',
+            'abr': sample_rate * channels * 16 / 1000,
+            'asr': sample_rate,
+            'audio_channels': channels,
+            'filesize': 44 + seconds * sample_rate * channels * 2,
+        } for format_id, sample_rate, channels in FORMATS]
+        return {
+            'id': video_id,
+            'title': f'Stub {video_id}',
+            'duration': seconds,
+            'webpage_url': url,
+            'formats': formats,
+        }
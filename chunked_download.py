@@ -0,0 +1,162 @@
+import os
+import threading
+
+import config
+from metrics import metrics
+
+# Byte-range downloads of one file over several connections. Every connection
+# writes its chunks straight to their offset in a preallocated .chunked file, so
+# the file is complete the moment the last chunk lands and nothing is copied
+# afterwards. It is not named .part: yt-dlp would take the preallocated size for
+# bytes already downloaded if it had to take the download over.
+
+READ_SIZE = 64 * 1024
+CHUNK_RETRIES = 3
+
+
+class ChunkedDownloadError(Exception):
+    pass
+
+
+def connection_count(requested, size):
+    # requested is the job's setting, 0 or None picks a count from the file size
+    if requested:
+        return requested
+    return max(1, min(config.DOWNLOAD_MAX_CONNECTIONS, size // config.CHUNKED_MIN_SIZE))
+
+
+def range_total(response):
+    # Total size from 'Content-Range: bytes 0-0/12345', None when ranges aren't honoured
+    if getattr(response, 'status', None) != 206:
+        return None
+    content_range = response.headers.get('Content-Range') or ''
+    total = content_range.rpartition('/')[2]
+    return int(total) if total.isdigit() else None
+
+
+class ChunkedDownload:
+    def __init__(self, open_range, path, size, connections, chunk_size=config.CHUNK_SIZE, progress_hook=None,
+                 cancelled=lambda: False):
+        # open_range(start, end) returns a readable response for bytes start..end inclusive.
+        # The download stops without retrying once cancelled() returns true; the
+        # .chunked file and its list of finished chunks are kept for resuming.
+        self.open_range = open_range
+        self.path = path
+        self.part_path = path + '.chunked'
+        self.chunks_path = path + '.chunked.list'  # finished chunk numbers, for resuming
+        self.sequential_path = path + '.part'  # left by a plain yt-dlp download
+        self.size = size
+        self.connections = connections
+        self.chunk_size = chunk_size
+        self.progress_hook = progress_hook or (lambda progress: None)
+        self.cancelled = cancelled
+        self.chunk_count = -(-size // chunk_size)
+        self.downloaded = 0
+        self._pending = []
+        self._lock = threading.Lock()
+        self._error = None
+
+    def run(self):
+        if not os.path.exists(self.part_path) and os.path.exists(self.sequential_path):
+            # Taken over, its complete leading chunks are kept
+            os.replace(self.sequential_path, self.part_path)
+            if os.path.exists(self.chunks_path):
+                os.remove(self.chunks_path)
+        done = self._finished_chunks()
+        self._pending = [index for index in range(self.chunk_count - 1, -1, -1) if index not in done]
+        self.downloaded = sum(self._chunk_length(index) for index in done)
+
+        # Preallocated once, chunks are then written in place
+        with open(self.part_path, 'r+b' if os.path.exists(self.part_path) else 'wb') as f:
+            f.truncate(self.size)
+        # Continued when it listed the finished chunks, otherwise started over with the
+        # chunks kept from a taken over .part, so the next resume keeps them too
+        resumed = done and os.path.exists(self.chunks_path)
+        with open(self.chunks_path, 'a' if resumed else 'w', encoding='utf-8') as self._chunks_file:
+            if not resumed:
+                self._chunks_file.write(f'{self.size} {self.chunk_size}\n')
+                self._chunks_file.writelines(f'{index}\n' for index in sorted(done))
+                self._chunks_file.flush()
+            threads = [threading.Thread(target=self._worker, name=f'chunk-{index}', daemon=True)
+                       for index in range(min(self.connections, len(self._pending)))]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        if self._error is not None:
+            raise ChunkedDownloadError(str(self._error)) from self._error
+        os.replace(self.part_path, self.path)
+        os.remove(self.chunks_path)
+        self.progress_hook({'status': 'finished', 'downloaded_bytes': self.size, 'total_bytes': self.size,
+                            'filename': self.path})
+        return self.path
+
+    def _finished_chunks(self):
+        if not os.path.exists(self.part_path):
+            return set()
+        if not os.path.exists(self.chunks_path):
+            # A .part taken over from a plain sequential download: its complete leading chunks are kept
+            return set(range(min(os.path.getsize(self.part_path) // self.chunk_size, self.chunk_count)))
+        with open(self.chunks_path, encoding='utf-8') as f:
+            lines = f.read().split('\n')
+        if lines[0] != f'{self.size} {self.chunk_size}':
+            return set()
+        # The last line may be cut short by a crash
+        return {int(line) for line in lines[1:-1] if line.isdigit() and int(line) < self.chunk_count}
+
+    def _chunk_length(self, index):
+        return min(self.chunk_size, self.size - index * self.chunk_size)
+
+    def _worker(self):
+        with open(self.part_path, 'r+b') as f:
+            while True:
+                with self._lock:
+                    if self.cancelled() and self._error is None:
+                        self._error = ChunkedDownloadError("Cancelled")
+                    if self._error is not None or not self._pending:
+                        return
+                    index = self._pending.pop()
+                for attempt in range(CHUNK_RETRIES):
+                    try:
+                        self._download_chunk(f, index)
+                        break
+                    except Exception as e:
+                        if attempt == CHUNK_RETRIES - 1 or self.cancelled():
+                            with self._lock:
+                                self._error = self._error or e
+                            return
+                        metrics.count('retries', stage='range')
+                with self._lock:
+                    self._chunks_file.write(f'{index}\n')
+                    self._chunks_file.flush()
+
+    def _download_chunk(self, f, index):
+        start = index * self.chunk_size
+        end = start + self._chunk_length(index) - 1
+        written = 0
+        response = self.open_range(start, end)
+        try:
+            if getattr(response, 'status', 206) != 206:
+                raise ChunkedDownloadError(f"Server ignored the byte range (HTTP {response.status})")
+            f.seek(start)
+            while written <= end - start:
+                data = response.read(min(READ_SIZE, end - start + 1 - written))
+                if not data:
+                    raise ChunkedDownloadError(f"Connection closed {end - start + 1 - written} bytes early")
+                f.write(data)
+                written += len(data)
+                self._add_progress(len(data))
+        except Exception:
+            # A retry downloads the whole chunk again
+            self._add_progress(-written)
+            raise
+        finally:
+            response.close()
+
+    def _add_progress(self, count):
+        with self._lock:
+            self.downloaded += count
+            progress = {'status': 'downloading', 'downloaded_bytes': self.downloaded, 'total_bytes': self.size,
+                        'filename': self.path}
+        self.progress_hook(progress)
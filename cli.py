@@ -0,0 +1,242 @@
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+
+import config
+import engine
+from archive import open_archive
+from bandwidth import parse_rate
+from download_job import DownloadJob, DONE, SKIPPED, NORMAL, PRIORITIES
+from format_select import conversion_label, format_selector
+from journal import open_journal
+from metrics import metrics
+from progress import format_speed
+from transcoder import CODEC_ARGS
+from ytdlp_cache import ytdlp_cache
+
+SUMMARY_INTERVAL = 5  # seconds between aggregate progress lines
+RATE_FILE_INTERVAL = 1  # seconds between checks of --limit-rate-file
+
+# Headless entry point. Must never import PyQt6.
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='yt-to-local', description="Download YouTube audio without the GUI.")
+    parser.add_argument('urls', nargs='*', metavar='URL', help="video, playlist or channel URLs")
+    parser.add_argument('-a', '--batch-file', metavar='FILE',
+                        help="read URLs from FILE, one per line ('-' for stdin, '#' starts a comment)")
+    parser.add_argument('-q', '--quality', default='best',
+                        help="'best', 'worst' or a bitrate in kbps; the closest stream at or below it is used (default: best)")
+    parser.add_argument('-t', '--type', default='mp3',
+                        help=f"comma separated output file types: {', '.join(CODEC_ARGS)} (default: mp3)")
+    parser.add_argument('-o', '--output', default='.', help="output directory (default: current directory)")
+    parser.add_argument('--resume', action='store_true',
+                        help="also resume downloads left unfinished by an earlier run")
+    parser.add_argument('--rm-cache-dir', action='store_true',
+                        help="clear yt-dlp's cache of solved player signatures before starting")
+    parser.add_argument('--index-library', metavar='DIR',
+                        help="hash the files in DIR so downloads with the same audio are reported as duplicates")
+    parser.add_argument('-j', '--jobs', type=int, default=config.DOWNLOAD_WORKERS,
+                        help=f"concurrent downloads (default: {config.DOWNLOAD_WORKERS})")
+    parser.add_argument('--lookups', type=int, default=config.RESOLVE_WORKERS, metavar='N',
+                        help=f"URLs looked up at the same time (default: {config.RESOLVE_WORKERS})")
+    parser.add_argument('-N', '--connections', type=int, default=config.DOWNLOAD_CONNECTIONS,
+                        help="connections per download for large streams, 0 picks one from the file size "
+                             f"(default: {config.DOWNLOAD_CONNECTIONS})")
+    parser.add_argument('-r', '--limit-rate', type=parse_rate, default=config.BANDWIDTH_LIMIT, metavar='RATE',
+                        help="cap on the combined download rate, e.g. 500K or 2M per second (default: no cap)")
+    parser.add_argument('--limit-rate-file', metavar='FILE',
+                        help="read the rate cap from FILE and apply it whenever the file changes")
+    parser.add_argument('--stream', action='store_true', default=config.STREAM_ENCODE,
+                        help="pipe downloads straight into ffmpeg instead of writing the source file first")
+    parser.add_argument('-p', '--priority', choices=PRIORITIES, default=NORMAL,
+                        help="priority of the given URLs; higher priority jobs start first and get "
+                             "a larger share of the bandwidth (default: normal)")
+    parser.add_argument('--metrics-log', metavar='FILE', default=config.METRICS_LOG,
+                        help="append the timing of every job stage to FILE as JSON lines")
+    parser.add_argument('--metrics-prom', metavar='FILE', default=config.METRICS_PROM,
+                        help="keep timings and counters in FILE in Prometheus text format")
+    parser.add_argument('-v', '--verbose', action='store_true', help="log debug messages")
+    args = parser.parse_args(argv)
+
+    args.filetypes = [filetype.strip() for filetype in args.type.split(',') if filetype.strip()]
+    unknown = [filetype for filetype in args.filetypes if filetype not in CODEC_ARGS]
+    if unknown or not args.filetypes:
+        parser.error(f"unsupported file type: {', '.join(unknown) or args.type}")
+    if args.quality not in ('best', 'worst') and not args.quality.isdigit():
+        parser.error("--quality must be 'best', 'worst' or a number")
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.lookups < 1:
+        parser.error("--lookups must be at least 1")
+    if args.connections < 0:
+        parser.error("--connections can't be negative")
+
+    if args.batch_file:
+        args.urls += read_batch_file(args.batch_file)
+    args.urls = list(dict.fromkeys(args.urls))  # the same URL twice would download it twice
+    if not args.urls and not args.resume and not args.index_library:
+        parser.error("no URLs given")
+    return args
+
+
+def read_batch_file(path):
+    handle = sys.stdin if path == '-' else open(path, encoding='utf-8')
+    with handle:
+        return engine.parse_urls(handle.read())
+
+
+def pick_stream(info, quality, filetypes):
+    streams = engine.audio_streams(info, filetypes)  # fewest re-encodes first
+    if not streams:
+        return None
+    lowest = min(streams, key=lambda stream: float(stream.abr))
+    if quality == 'best':
+        return streams[0]
+    if quality == 'worst':
+        return lowest
+    below = [stream for stream in streams if float(stream.abr) <= int(quality)]
+    return below[0] if below else lowest
+
+
+def watch_rate_file(path, manager):
+    # Lets the cap be changed while downloads run, e.g. echo 1M > FILE
+    modified = None
+    while True:
+        try:
+            mtime = os.path.getmtime(path)
+            if mtime != modified:
+                modified = mtime
+                with open(path, encoding='utf-8') as f:
+                    rate = parse_rate(f.read().strip() or '0')
+                manager.set_rate_limit(rate)
+                print(f"Rate limit: {format_speed(rate) if rate else 'none'}", flush=True)
+        except OSError:
+            pass
+        except ValueError as e:
+            print(f"{path}: {e}", file=sys.stderr)
+        time.sleep(RATE_FILE_INTERVAL)
+
+
+class Reporter:
+    def __init__(self):
+        self.manager = None
+        self._lock = threading.Lock()
+        self._states = {}
+        self._summary_at = time.monotonic()
+
+    def __call__(self, job):
+        # State changes are printed as they happen, progress as a periodic summary
+        with self._lock:
+            if self._states.get(job.job_id) != job.state:
+                self._states[job.job_id] = job.state
+                line = f"[{job.job_id}] {job.state}: {job.title}"
+                if job.error:
+                    line += f" ({job.error})"
+                print(line, flush=True)
+
+            now = time.monotonic()
+            if self.manager is not None and now - self._summary_at >= SUMMARY_INTERVAL:
+                self._summary_at = now
+                print(f"{self.manager.active_count()} active, {self.manager.pending_count()} pending, "
+                      f"{format_speed(self.manager.total_speed())}", flush=True)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else config.LOG_LEVEL,
+                        format='%(levelname)s %(name)s: %(message)s')
+    metrics.log_path = args.metrics_log
+    metrics.prom_path = args.metrics_prom
+    save_path = os.path.abspath(args.output)
+    os.makedirs(save_path, exist_ok=True)
+
+    if args.rm_cache_dir:
+        ytdlp_cache.invalidate()
+    else:
+        ytdlp_cache.prune()
+
+    archive = open_archive()
+    if args.index_library:
+        if archive is None:
+            print("The download archive is disabled (YTL_ARCHIVE=0)", file=sys.stderr)
+            return 1
+        archive.hash_files = True
+        print(f"Indexed {archive.index_library(args.index_library)} new files", flush=True)
+        if not args.urls and not args.resume:
+            return 0
+    journal = open_journal()
+    resumable = journal.unfinished() if journal is not None and args.resume else []
+
+    reporter = Reporter()
+    manager = engine.DownloadManager(args.jobs, on_update=reporter, journal=journal, archive=archive,
+                                     stream_encode=args.stream)
+    reporter.manager = manager
+    manager.set_rate_limit(args.limit_rate)
+    if args.limit_rate_file:
+        threading.Thread(target=watch_rate_file, args=(args.limit_rate_file, manager), daemon=True).start()
+    failed_lookups = 0
+    interrupted = False
+    # Stops lookups and playlist expansion still running in other threads after Ctrl+C
+    interrupt = threading.Event()
+    try:
+        for job in resumable:
+            print(f"Resuming: {job.title}", flush=True)
+            manager.submit(job)
+
+        selector = format_selector(args.filetypes, args.quality)
+        urls = []
+        for url in args.urls:
+            if archive is not None and all(archive.contains(url, selector, filetype) for filetype in args.filetypes):
+                print(f"Already downloaded: {url}", flush=True)
+            else:
+                urls.append(url)
+
+        # Jobs are submitted as their lookups finish, while the remaining ones still run
+        for url, info, error in engine.resolve_many(urls, args.lookups, interrupt.is_set):
+            if error is not None:
+                print(f"Could not resolve {url}: {error}", file=sys.stderr)
+                failed_lookups += 1
+                continue
+
+            if engine.is_playlist(info):
+                print(f"Expanding playlist: {info['title']}", flush=True)
+                for entry_url, title in engine.iter_playlist_entries(url, interrupt.is_set):
+                    if not manager.acquire_slot(interrupt.is_set):
+                        break
+                    manager.submit(DownloadJob(entry_url, None, None, args.filetypes, save_path, title=title,
+                                               format_selector=selector, connections=args.connections,
+                                               priority=args.priority),
+                                   holds_slot=True)
+                continue
+
+            # Without bitrate information yt-dlp's own selector picks the stream
+            stream = pick_stream(info, args.quality, args.filetypes)
+            if stream:
+                print(f"{info.get('title', url)}: {stream.format_id} ({conversion_label(stream, args.filetypes)})",
+                      flush=True)
+            manager.submit(DownloadJob(url, info, stream, args.filetypes, save_path,
+                                       format_selector=selector, connections=args.connections,
+                                       priority=args.priority))
+
+        manager.wait()
+    except KeyboardInterrupt:
+        # Running downloads stop right away; --resume continues them
+        interrupted = True
+        interrupt.set()
+        print("Interrupted", file=sys.stderr)
+        return 130
+    finally:
+        manager.shutdown(abort=interrupted)
+
+    jobs = list(manager.jobs.values())
+    done = sum(1 for job in jobs if job.state in (DONE, SKIPPED))
+    print(f"{done} of {len(jobs)} downloads finished", flush=True)
+    return 0 if done == len(jobs) and not failed_lookups else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
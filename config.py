@@ -0,0 +1,136 @@
+import os
+
+# Every setting can be overridden from the environment, e.g. YTL_METADATA_CACHE_TTL=600
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+def _env_float(name, default):
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    if not value:
+        return default
+    return value.lower() not in ('0', 'false', 'no', 'off')
+
+def _env_path(name, default):
+    return os.path.expanduser(os.environ.get(name) or default)
+
+CACHE_DIR = _env_path('YTL_CACHE_DIR', os.path.join(os.environ.get('XDG_CACHE_HOME') or '~/.cache', 'yt-to-local'))
+DATA_DIR = _env_path('YTL_DATA_DIR', os.path.join(os.environ.get('XDG_DATA_HOME') or '~/.local/share', 'yt-to-local'))
+
+# In-memory metadata cache. Signed stream URLs in an info dict expire after a few
+# hours, so entries must not outlive them.
+METADATA_CACHE_SIZE = _env_int('YTL_METADATA_CACHE_SIZE', 256)
+METADATA_CACHE_TTL = _env_int('YTL_METADATA_CACHE_TTL', 30 * 60)
+
+# On-disk metadata store, survives restarts
+METADATA_STORE = _env_bool('YTL_METADATA_STORE', True)
+METADATA_DB = _env_path('YTL_METADATA_DB', os.path.join(DATA_DIR, 'metadata.sqlite3'))
+# Used when a stream URL carries no expire= parameter
+FORMAT_URL_TTL = _env_int('YTL_FORMAT_URL_TTL', 5 * 60 * 60)
+# Stream URLs closer than this to expiry are refreshed before downloading
+FORMAT_URL_MARGIN = _env_int('YTL_FORMAT_URL_MARGIN', 10 * 60)
+
+# yt-dlp's own cache (player signature and nsig solutions). Kept between runs
+# instead of being wiped; trimmed to a size cap and an age limit on startup.
+YTDLP_CACHE_DIR = _env_path('YTL_YTDLP_CACHE_DIR', os.path.join(CACHE_DIR, 'yt-dlp'))
+YTDLP_CACHE_MAX_MB = _env_int('YTL_YTDLP_CACHE_MAX_MB', 50)
+YTDLP_CACHE_MAX_AGE = _env_int('YTL_YTDLP_CACHE_MAX_AGE', 14 * 24 * 60 * 60)
+
+# Journal of unfinished jobs, used to resume them after a crash or restart
+JOURNAL = _env_bool('YTL_JOURNAL', True)
+JOURNAL_DB = _env_path('YTL_JOURNAL_DB', os.path.join(DATA_DIR, 'journal.sqlite3'))
+
+# Archive of finished downloads; jobs already in it are skipped before any network work
+ARCHIVE = _env_bool('YTL_ARCHIVE', True)
+ARCHIVE_DB = _env_path('YTL_ARCHIVE_DB', os.path.join(DATA_DIR, 'archive.sqlite3'))
+# Also index finished files by SHA-256 so identical audio saved under another name is detected
+ARCHIVE_HASH = _env_bool('YTL_ARCHIVE_HASH', False)
+
+# Partial downloads, source files and conversions live in a local scratch directory.
+# Only finished files are moved into the output folder: renamed when both are on
+# one filesystem, otherwise copied once under a hidden name and then renamed. It is
+# on disk so partial downloads survive a crash or reboot; pointing it at tmpfs
+# (e.g. /dev/shm/yt-to-local) trades that for speed. SCRATCH=0 works in a hidden
+# folder per job inside the output folder.
+SCRATCH = _env_bool('YTL_SCRATCH', True)
+SCRATCH_DIR = _env_path('YTL_SCRATCH_DIR', os.path.join(CACHE_DIR, 'scratch'))
+
+# Number of downloads that run at the same time
+DOWNLOAD_WORKERS = _env_int('YTL_DOWNLOAD_WORKERS', 3)
+
+# Number of URLs looked up at the same time when several are pasted or given at once
+RESOLVE_WORKERS = _env_int('YTL_RESOLVE_WORKERS', 8)
+
+# Links pasted or typed into the URL box are looked up in the background once the
+# text has stayed the same for PREFETCH_DELAY seconds, so Find usually answers from
+# the metadata cache
+PREFETCH = _env_bool('YTL_PREFETCH', True)
+PREFETCH_DELAY = _env_float('YTL_PREFETCH_DELAY', 0.4)
+PREFETCH_WORKERS = _env_int('YTL_PREFETCH_WORKERS', 4)
+
+# Cap on the combined download rate in bytes per second, 0 for none. Running jobs
+# share it by priority; it can be changed while downloads run.
+BANDWIDTH_LIMIT = _env_int('YTL_LIMIT_RATE', 0)
+# A job that would have to wait behind lower priority downloads pauses one of
+# them and takes its place; the paused one continues later from its partial file
+PREEMPT = _env_bool('YTL_PREEMPT', True)
+
+# YoutubeDL sessions are kept and reused so connections, cookies and TLS sessions
+# survive between jobs. At most SESSION_POOL_SIZE idle sessions are kept; a session
+# is replaced after SESSION_MAX_USES uses or SESSION_MAX_AGE seconds.
+SESSION_POOL_SIZE = _env_int('YTL_SESSION_POOL_SIZE', DOWNLOAD_WORKERS + RESOLVE_WORKERS)
+SESSION_MAX_USES = _env_int('YTL_SESSION_MAX_USES', 200)
+SESSION_MAX_AGE = _env_int('YTL_SESSION_MAX_AGE', 30 * 60)
+
+# Connections per download. Large HTTP streams are fetched as byte ranges and
+# DASH/HLS streams as fragments in parallel. 0 picks the count from the file size:
+# one connection per CHUNKED_MIN_SIZE bytes, at most DOWNLOAD_MAX_CONNECTIONS.
+DOWNLOAD_CONNECTIONS = _env_int('YTL_DOWNLOAD_CONNECTIONS', 0)
+DOWNLOAD_MAX_CONNECTIONS = _env_int('YTL_DOWNLOAD_MAX_CONNECTIONS', 4)
+CHUNKED_MIN_SIZE = _env_int('YTL_CHUNKED_MIN_SIZE', 8 * 1024 * 1024)
+CHUNK_SIZE = _env_int('YTL_CHUNK_SIZE', 4 * 1024 * 1024)
+
+# How many playlist entries may wait in the download queue before expansion pauses;
+# keeps memory flat for playlists and channels with thousands of videos
+PLAYLIST_QUEUE_AHEAD = _env_int('YTL_PLAYLIST_QUEUE_AHEAD', 50)
+
+# Transcoding runs in its own stage: one ffmpeg process per core by default, fed by a
+# bounded queue so downloads pause instead of piling up source files
+FFMPEG = os.environ.get('YTL_FFMPEG') or 'ffmpeg'
+TRANSCODE_WORKERS = _env_int('YTL_TRANSCODE_WORKERS', os.cpu_count() or 1)
+TRANSCODE_QUEUE_SIZE = _env_int('YTL_TRANSCODE_QUEUE_SIZE', TRANSCODE_WORKERS)
+# Streaming mode: downloads are piped straight into ffmpeg and only the converted
+# files are written, instead of the source being written to the output directory
+# and read back. Streams that need the file path (DASH/HLS, MP4 containers, partial
+# downloads) still take it; the encoder runs in the download worker.
+STREAM_ENCODE = _env_bool('YTL_STREAM_ENCODE', False)
+
+# The GUI's event loop is checked every STALL_INTERVAL seconds; when it is blocked
+# for longer than STALL_THRESHOLD seconds, the main thread's stack is logged and the
+# stall counted in the metrics. 0 turns the watchdog off.
+STALL_THRESHOLD = _env_float('YTL_STALL_THRESHOLD', 0.2)
+STALL_INTERVAL = _env_float('YTL_STALL_INTERVAL', 0.1)
+
+# Build the window from main.ui at runtime instead of the precompiled ui_main.py
+UI_FROM_XML = _env_bool('YTL_UI_FROM_XML', False)
+
+# Progress updates per job are coalesced to at most one every PROGRESS_INTERVAL seconds.
+# Speeds are averaged over roughly PROGRESS_SMOOTHING seconds.
+PROGRESS_INTERVAL = _env_float('YTL_PROGRESS_INTERVAL', 0.5)
+PROGRESS_SMOOTHING = _env_float('YTL_PROGRESS_SMOOTHING', 3.0)
+
+# Level of the app's own log messages on stderr: debug, info, warning or error
+LOG_LEVEL = (os.environ.get('YTL_LOG_LEVEL') or 'warning').upper()
+
+# Timings of each job stage and counters for bytes, retries and failures. METRICS_LOG
+# gets one JSON line per finished stage; METRICS_PROM is rewritten at most every
+# METRICS_INTERVAL seconds in Prometheus text format, e.g. for node exporter's
+# textfile collector. Both are off unless a path is set.
+METRICS_LOG = _env_path('YTL_METRICS_LOG', '')
+METRICS_PROM = _env_path('YTL_METRICS_PROM', '')
+METRICS_INTERVAL = _env_float('YTL_METRICS_INTERVAL', 15)
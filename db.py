@@ -0,0 +1,13 @@
+import os
+import sqlite3
+
+
+def connect(path, synchronous='NORMAL'):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Connections are shared between worker threads; callers serialize access with a lock
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute(f'PRAGMA synchronous={synchronous}')
+    return conn
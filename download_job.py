@@ -0,0 +1,78 @@
+import itertools
+
+QUEUED = 'queued'
+DOWNLOADING = 'downloading'
+CONVERTING = 'converting'
+DONE = 'done'
+FAILED = 'failed'
+SKIPPED = 'skipped'  # already in the download archive
+CANCELLED = 'cancelled'
+
+ACTIVE_STATES = (DOWNLOADING, CONVERTING)
+FINAL_STATES = (DONE, FAILED, SKIPPED, CANCELLED)
+
+# Why a running job was asked to stop
+CANCEL = 'cancel'  # by the user: the job ends and its partial files are removed
+PREEMPT = 'preempt'  # for a higher priority job: it goes back to the queue and keeps its partial download
+SHUTDOWN = 'shutdown'  # the app is closing: left as it is, to be resumed from the journal
+
+# Job priorities: bandwidth share and the order queued jobs start in
+HIGH = 'high'
+NORMAL = 'normal'
+LOW = 'low'
+PRIORITIES = (HIGH, NORMAL, LOW)
+
+_job_ids = itertools.count(1)
+
+
+class DownloadJob:
+    def __init__(self, url, info, selected_stream, filetypes, save_path, title=None, format_selector=None,
+                 connections=None, priority=NORMAL):
+        self.job_id = next(_job_ids)
+        self.url = url
+        # Only info's title is kept; the dict itself stays in the metadata cache,
+        # found again through selected_stream or the URL when the job downloads
+        self.selected_stream = selected_stream  # a StreamDescriptor, or None to use format_selector
+        self.filetypes = list(filetypes)  # every format is encoded from one download
+        self.save_path = save_path
+        self.state = QUEUED
+        self.progress = 0
+        self.downloaded_bytes = 0
+        self.total_bytes = None
+        self.speed = 0.0  # smoothed bytes per second
+        self.eta = None  # seconds
+        self.error = None
+        self.source_path = None  # downloaded file waiting for conversion
+        self.download_path = None  # file being downloaded, known from the first progress update
+        self.stop_reason = None  # CANCEL, PREEMPT or SHUTDOWN once the job should stop
+        self.streaming = False  # piped into ffmpeg right now, so it can't be paused and continued
+        self.format_id = None  # format yt-dlp actually downloaded
+        self.source_codec = None  # its audio codec, decides between stream copy and re-encode
+        self.journal_id = None
+        self.connections = connections  # parallel connections for this download, None uses the config
+        self.priority = priority
+        self._title = title or (info.get('title') if info else None)
+        self._format_selector = format_selector
+
+    @property
+    def title(self):
+        return self._title or self.url
+
+    @property
+    def format_selector(self):
+        # Playlist entries carry no resolved stream, yt-dlp picks one at download time.
+        # Once it has, a retry or resumed job asks for the same format and so
+        # continues its partial download.
+        if self.selected_stream:
+            return self.selected_stream.format_id
+        return self.format_id or self._format_selector or 'bestaudio/best'
+
+    @property
+    def requested_format(self):
+        # The selector the job was submitted with, before a stream was picked
+        return self._format_selector
+
+    @property
+    def quality(self):
+        abr = self.selected_stream.abr if self.selected_stream else None
+        return f"{abr} kbps" if abr else "best"
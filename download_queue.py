@@ -0,0 +1,74 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from PyQt6.QtCore import QObject, pyqtSignal
+import config
+from engine import DownloadManager, remove_scratch_files
+from journal import open_journal
+from archive import open_archive
+
+log = logging.getLogger(__name__)
+
+class DownloadQueue(QObject):
+    job_added = pyqtSignal(object)
+    job_updated = pyqtSignal(object)  # emitted from engine threads, delivered on the GUI thread
+
+    def __init__(self, max_workers=config.DOWNLOAD_WORKERS, parent=None):
+        super().__init__(parent)
+        self.journal = open_journal()
+        # Read before anything is submitted, so only jobs from earlier runs are listed
+        self.resumable_jobs = self.journal.unfinished() if self.journal is not None else []
+        self.manager = DownloadManager(max_workers, on_update=self.job_updated.emit, journal=self.journal,
+                                      archive=open_archive())
+        # Submitting and cancelling write the journal with an fsync, so they run on
+        # a helper thread instead of the GUI thread; a single one keeps their order
+        self._commands = ThreadPoolExecutor(max_workers=1, thread_name_prefix='queue')
+
+    def _run_later(self, function, *args):
+        self._commands.submit(function, *args).add_done_callback(self._check_command)
+
+    def _check_command(self, future):
+        if future.exception() is not None:
+            log.error("Download queue command failed", exc_info=future.exception())
+
+    def submit(self, job, holds_slot=False):
+        self._run_later(self.manager.submit, job, holds_slot)
+        self.job_added.emit(job)
+        return job
+
+    def resume(self):
+        for job in self.resumable_jobs:
+            self.submit(job)
+        self.resumable_jobs = []
+
+    def discard_resumable(self):
+        if self.journal is not None:
+            self._run_later(self.journal.discard, self.resumable_jobs)
+        self._run_later(remove_scratch_files, self.resumable_jobs)
+        self.resumable_jobs = []
+
+    def cancel(self, job):
+        self._run_later(self.manager.cancel, job)
+
+    def shutdown(self):
+        # Running jobs stop where they are and are offered for resuming on the next start
+        self._commands.shutdown()
+        self.manager.shutdown(abort=True)
+
+    def set_priority(self, job, priority):
+        self._run_later(self.manager.set_priority, job, priority)
+        self.job_updated.emit(job)
+
+    def set_rate_limit(self, rate):
+        self.manager.set_rate_limit(rate)
+
+    def acquire_slot(self, cancelled=lambda: False):
+        return self.manager.acquire_slot(cancelled)
+
+    def active_count(self):
+        return self.manager.active_count()
+
+    def pending_count(self):
+        return self.manager.pending_count()
+
+    def total_speed(self):
+        return self.manager.total_speed()
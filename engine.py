@@ -0,0 +1,843 @@
+import errno
+import glob
+import itertools
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError, as_completed
+from urllib.parse import urlparse
+
+import config
+from bandwidth import BandwidthScheduler
+from chunked_download import ChunkedDownload, ChunkedDownloadError, connection_count, range_total
+from download_job import (QUEUED, DOWNLOADING, CONVERTING, DONE, FAILED, SKIPPED, CANCELLED, ACTIVE_STATES,
+                          FINAL_STATES, PRIORITIES, CANCEL, PREEMPT, SHUTDOWN)
+from format_select import rank_streams
+from metadata_cache import cache_key, info_cache_key, metadata_cache
+from metadata_store import audio_formats, urls_expired
+from metrics import metrics
+from progress import ProgressAggregator
+from session_pool import session_pool
+from stream_descriptor import StreamDescriptor
+from transcoder import TranscodeError, TranscodeStage, run_ffmpeg, transcode_stream
+from ytdlp_cache import ytdlp_cache
+
+# Qt-free core shared by the GUI (through download_queue.DownloadQueue) and the CLI.
+# yt_dlp takes a long time to import, so it is only imported where it is used.
+
+PLAYLIST_TYPES = ('playlist', 'multi_video')
+MAX_NESTING = 2  # channel -> tab -> playlist
+SOURCE_SUFFIX = '.source.'
+# ffmpeg needs to seek in these: an MP4 file's index may come after the audio
+SEEKING_CONTAINERS = ('mp4', 'm4a', 'm4b', 'mov', '3gp')
+STREAM_READ_SIZE = 64 * 1024
+
+# Flat extraction: a playlist is only identified, its entries are not enumerated
+RESOLVE_OPTS = {'socket_timeout': 15, 'extract_flat': 'in_playlist', 'noplaylist': True}
+PLAYLIST_OPTS = {'socket_timeout': 15, 'extract_flat': 'in_playlist', 'lazy_playlist': True}
+
+log = logging.getLogger(__name__)
+
+_resolving = {}  # url -> Future of a lookup in progress
+_resolving_lock = threading.Lock()
+
+
+def ydl_options(**opts):
+    # Every YoutubeDL shares the managed cache directory, so solved player
+    # signatures are reused across extractions and runs
+    return {'quiet': True, 'cachedir': ytdlp_cache.path, **opts}
+
+
+def warm_up():
+    # Pays the yt_dlp import and extractor setup cost ahead of the first lookup, and
+    # leaves the warmed up session in the pool for it; the GUI runs this on a
+    # background thread once the window is visible
+    ytdlp_cache.prune()
+    with session_pool.session(ydl_options(**RESOLVE_OPTS)) as ydl:
+        ydl.get_info_extractor('Youtube')
+        ydl.get_info_extractor('YoutubeTab')
+
+
+def is_playlist(info):
+    return info.get('_type') in PLAYLIST_TYPES
+
+
+def resolve(url, cancelled=None):
+    # Returns the video info dict, or a {'_type': 'playlist', ...} summary whose
+    # entries are expanded later by iter_playlist_entries. Raises DownloadError,
+    # or DownloadCancelled soon after cancelled() returns true.
+    info = metadata_cache.get(url, allow_stale=True)
+    if info is not None:
+        return info
+
+    from yt_dlp.utils import DownloadCancelled
+    # A lookup of the same URL that is already running (a prefetch, or a
+    # duplicate in a batch) is waited for instead of started again
+    while True:
+        with _resolving_lock:
+            future = _resolving.get(url)
+            started = future is None
+            if started:
+                future = _resolving[url] = Future()
+        if started:
+            break
+        try:
+            return _wait_for(future, cancelled)
+        except DownloadCancelled:
+            if cancelled is not None and cancelled():
+                raise
+            # Only the lookup we waited for was cancelled, start one ourselves
+    try:
+        info = _extract(url, cancelled)
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(info)
+        return info
+    finally:
+        with _resolving_lock:
+            del _resolving[url]
+
+
+def _wait_for(future, cancelled):
+    while True:
+        try:
+            return future.result(timeout=0.2)
+        except TimeoutError:
+            if cancelled is not None and cancelled():
+                from yt_dlp.utils import DownloadCancelled
+                raise DownloadCancelled("Cancelled")
+
+
+def _extract(url, cancelled):
+    with metrics.span('resolve', url=url, cancelled=cancelled), \
+            session_pool.session(ydl_options(**RESOLVE_OPTS), cancelled=cancelled) as ydl:
+        info = ydl.extract_info(url, download=False, process=False)
+        if not is_playlist(info):
+            info = ydl.process_ie_result(info, download=False)
+    if is_playlist(info):
+        return {'_type': 'playlist', 'webpage_url': url, 'id': info.get('id'), 'title': info.get('title') or url}
+
+    metadata_cache.put(url, info)
+    return info
+
+
+def parse_urls(text):
+    # URLs separated by newlines or spaces, as pasted or read from a batch file;
+    # '#' starts a comment line and repeated URLs are dropped
+    urls = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line and not line.startswith('#'):
+            urls += line.split()
+    return list(dict.fromkeys(urls))
+
+
+def resolve_many(urls, workers=config.RESOLVE_WORKERS, cancelled=lambda: False):
+    # Resolves several URLs at once and yields (url, info, error) as each lookup
+    # finishes, fastest first; error is None on success. Each running lookup
+    # takes its own session from the pool.
+    executor = ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix='resolve')
+    futures = {executor.submit(resolve, url, cancelled): url for url in urls}
+    try:
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, e
+            if cancelled():
+                return
+    except BaseException:
+        # Interrupted (Ctrl+C) or closed early: running lookups aren't waited for,
+        # they stop at their next request once cancelled() is true
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    # Lookups that haven't started are dropped, running ones are waited for
+    executor.shutdown(cancel_futures=True)
+
+
+def looks_like_url(text):
+    # Cheap check before a speculative lookup; a URL still being typed usually fails it
+    parts = urlparse(text)
+    return parts.scheme in ('http', 'https') and '.' in parts.netloc and not parts.netloc.endswith('.')
+
+
+class Prefetcher:
+    # Looks URLs up in the background as soon as they are pasted, so resolve()
+    # later finds them in the metadata cache or joins the lookup in flight. Only
+    # the latest text matters: when it changes, lookups that haven't started are
+    # dropped and running ones stop at their next request.
+
+    def __init__(self, workers=config.PREFETCH_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='prefetch')
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def prefetch(self, urls):
+        generation = self.cancel()
+        for url in urls:
+            self._executor.submit(self._lookup, url, generation)
+
+    def cancel(self):
+        with self._lock:
+            self._generation += 1
+            return self._generation
+
+    def shutdown(self):
+        self.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _lookup(self, url, generation):
+        if generation != self._generation:
+            return
+        try:
+            resolve(url, lambda: generation != self._generation)
+        except Exception as e:
+            # Find reports the error if the user asks for this URL
+            log.debug("Prefetch of %s failed: %s", url, e)
+
+
+def audio_streams(info, filetypes=None):
+    # Descriptors of the audio formats with a known bitrate, best first. With
+    # filetypes, streams that can be copied into them rank above ones that must
+    # be re-encoded.
+    key = info_cache_key(info) or cache_key(info.get('webpage_url') or '')
+    fetched_at = time.time()
+    streams = [StreamDescriptor.from_format(stream, key, fetched_at)
+               for stream in audio_formats(info) if stream.get('abr')]
+    if filetypes:
+        return rank_streams(streams, filetypes)
+    return sorted(streams, key=lambda stream: float(stream.abr), reverse=True)
+
+
+def iter_playlist_entries(url, cancelled=lambda: False):
+    # lazy_playlist pulls playlist pages as the entries are consumed, so the
+    # first downloads start long before a large playlist is fully enumerated
+    with session_pool.session(ydl_options(**PLAYLIST_OPTS), cancelled=cancelled) as ydl:
+        info = ydl.extract_info(url, download=False, process=False)
+        yield from _iter_entries(ydl, info, 0, cancelled)
+
+
+def _iter_entries(ydl, info, depth, cancelled):
+    for entry in info.get('entries') or []:
+        if cancelled():
+            return
+        if not entry:
+            continue
+        if entry.get('_type') in PLAYLIST_TYPES and depth < MAX_NESTING:
+            yield from _iter_entries(ydl, entry, depth + 1, cancelled)
+        elif entry.get('ie_key') == 'YoutubeTab' and depth < MAX_NESTING:
+            # Channel pages list their tabs and playlists as entries
+            nested = ydl.extract_info(entry['url'], download=False, process=False)
+            yield from _iter_entries(ydl, nested, depth + 1, cancelled)
+        else:
+            entry_url = entry.get('webpage_url') or entry.get('url')
+            if entry_url:
+                yield entry_url, entry.get('title') or entry_url
+
+
+def download_source(job, progress_hook):
+    # Downloads the selected audio stream without converting it and returns its path
+    from yt_dlp.utils import DownloadError
+
+    connections = job.connections if job.connections is not None else config.DOWNLOAD_CONNECTIONS
+    ydl_opts = ydl_options(
+        # Same output name on every attempt, so a .part file left by a crash is continued
+        continuedl=True,
+        noprogress=True,
+        # DASH and HLS streams: yt-dlp fetches the fragments in parallel itself
+        concurrent_fragment_downloads=connections or config.DOWNLOAD_MAX_CONNECTIONS,
+    )
+
+    def attempt(info):
+        with session_pool.session(ydl_opts, format=job.format_selector, progress_hook=progress_hook,
+                                  outtmpl=os.path.join(scratch_dir(job), f'%(title)s{SOURCE_SUFFIX}%(ext)s'),
+                                  cancelled=lambda: job.stop_reason is not None) as ydl:
+            if info is None:
+                # Stored metadata is still valid, only the signed stream URLs need refreshing
+                info = ydl.extract_info(job.url, download=False)
+                metadata_cache.put(job.url, info)
+            return fetch(ydl, info, connections, progress_hook, job)
+
+    info = job_info(job)
+    try:
+        result = attempt(info)
+    except (DownloadError, ChunkedDownloadError) as e:
+        if job.stop_reason is not None:
+            raise
+        # Signed stream URLs in the cached info went stale
+        log.info("Retrying %s with fresh stream URLs: %s", job.url, e)
+        metrics.count('retries', stage='download')
+        metadata_cache.invalidate(job.url)
+        if 'signature' in str(e).lower() or 'nsig' in str(e).lower():
+            # A player update made the cached signature solutions useless, on
+            # disk and in every pooled session's extractors
+            ytdlp_cache.invalidate_player()
+            session_pool.clear()
+        result = attempt(None)
+    # The chosen format's fields are merged into the result
+    record_format(job, result)
+    return result['requested_downloads'][0]['filepath']
+
+
+def record_format(job, selected):
+    job.format_id = selected.get('format_id')
+    # Direct file links often come without codec information, their extension tells it
+    acodec = selected.get('acodec')
+    job.source_codec = acodec if acodec not in (None, 'none') else selected.get('ext')
+
+
+def stream_source(job, filetypes, progress_hook):
+    # Streaming mode: pipes the selected stream straight into ffmpeg, so only the
+    # converted files are written, and returns their targets. Returns None when the
+    # stream needs the file path instead: DASH/HLS or merged formats, containers
+    # ffmpeg must seek in, a partial download to continue, or a failed attempt.
+    from yt_dlp.networking import Request
+
+    info = job_info(job)
+    with session_pool.session(ydl_options(noprogress=True), format=job.format_selector,
+                              outtmpl=os.path.join(scratch_dir(job), f'%(title)s{SOURCE_SUFFIX}%(ext)s'),
+                              cancelled=lambda: job.stop_reason is not None) as ydl:
+        if info is None:
+            info = ydl.extract_info(job.url, download=False)
+            metadata_cache.put(job.url, info)
+        with metrics.span('select', job):
+            selected = ydl.process_ie_result(ydl.sanitize_info(info, remove_private_keys=True), download=False)
+        source = ydl.prepare_filename(selected)
+        if (selected.get('requested_formats') or selected.get('protocol') not in ('http', 'https')
+                or selected.get('ext') in SEEKING_CONTAINERS
+                or any(os.path.exists(path) for path in (source, f'{source}.part', f'{source}.chunked'))):
+            return None
+
+        record_format(job, selected)
+        targets = output_targets(source, filetypes)
+
+        def blocks():
+            # The progress hook accounts bandwidth and raises once the job is stopped
+            response = ydl.urlopen(Request(selected['url'], headers=selected.get('http_headers') or {}))
+            try:
+                total = selected.get('filesize') or int(response.headers.get('Content-Length') or 0) or None
+                downloaded = 0
+                progress_hook({'status': 'downloading', 'downloaded_bytes': 0, 'total_bytes': total})
+                while True:
+                    block = response.read(STREAM_READ_SIZE)
+                    if not block:
+                        break
+                    downloaded += len(block)
+                    progress_hook({'status': 'downloading', 'downloaded_bytes': downloaded, 'total_bytes': total})
+                    yield block
+            finally:
+                response.close()
+
+        os.makedirs(scratch_dir(job), exist_ok=True)
+        job.streaming = True
+        start = time.perf_counter()
+        try:
+            transcode_stream(blocks(), targets, job.source_codec)
+        except Exception as e:
+            if job.stop_reason is not None:
+                metrics.record('download', time.perf_counter() - start, job, error=e, stopped=True)
+                raise
+            # Not a failure of the job, the file path takes over
+            log.info("Streaming %s failed, downloading it to a file instead: %s", job.url, e)
+            metrics.count('stream_fallbacks')
+            return None
+        finally:
+            job.streaming = False
+        metrics.record('download', time.perf_counter() - start, job)
+    return targets
+
+
+def job_info(job):
+    # Jobs don't hold info dicts, the metadata cache and store do. Found through
+    # the job's stream descriptor or its URL; None when the signed stream URLs
+    # have to be fetched again.
+    stream = job.selected_stream
+    if stream is not None and stream.expired():
+        return None
+    info = stream.info() if stream is not None else None
+    if info is None or urls_expired(info):
+        info = metadata_cache.get(job.url)
+    return info
+
+
+def fetch(ydl, info, connections, progress_hook, job=None):
+    # Downloads the format picked from a resolved info dict, reusing it instead of
+    # extracting the page again. Large single-file streams are fetched as parallel
+    # byte ranges, everything else by yt-dlp.
+    with metrics.span('select', job):
+        selected = ydl.process_ie_result(ydl.sanitize_info(info, remove_private_keys=True), download=False)
+        size = chunked_size(ydl, selected, connections)
+    if job is not None:
+        record_format(job, selected)  # journaled with the first progress update
+    if size is None:
+        # Byte ranges fetched by an earlier attempt can't be continued by yt-dlp
+        for path in glob.glob(f'{glob.escape(ydl.prepare_filename(selected))}.chunked*'):
+            os.remove(path)
+        with metrics.span('download', job):
+            return ydl.process_ie_result(ydl.sanitize_info(info, remove_private_keys=True), download=True)
+
+    path = ydl.prepare_filename(selected)
+    # Like yt-dlp, a finished file of the same name counts as already downloaded
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        download = ChunkedDownload(lambda start, end: open_range(ydl, selected, start, end), path, size,
+                                   connection_count(connections, size), progress_hook=progress_hook,
+                                   cancelled=lambda: job is not None and job.stop_reason is not None)
+        with metrics.span('download', job):
+            download.run()
+        fix_dash_container(path, selected, job)
+    selected['requested_downloads'] = [{'filepath': path}]
+    return selected
+
+
+def fix_dash_container(path, selected, job=None):
+    # yt-dlp's FFmpegFixupM4aPP for byte-range downloads, which skip its fixups: a
+    # DASH m4a (YouTube's format 140) only plays in some players, so it is stream
+    # copied into a plain MP4 container before it can be renamed into the library
+    if selected.get('ext') != 'm4a' or selected.get('container') != 'm4a_dash':
+        return
+    root, extension = os.path.splitext(path)
+    fixed = f'{root}.fixup{extension}'
+    cancelled = lambda: job is not None and job.stop_reason is not None
+    with metrics.span('postprocess', job):
+        returncode, stderr = run_ffmpeg([config.FFMPEG, '-y', '-nostdin', '-loglevel', 'error', '-i', path,
+                                         '-map', '0', '-c', 'copy', '-f', 'mp4', fixed], cancelled)
+        if returncode != 0 or cancelled():
+            if os.path.exists(fixed):
+                os.remove(fixed)
+            # Back under the byte-range name, so a retry keeps the bytes and runs this again
+            # instead of taking the file for finished
+            os.replace(path, f'{path}.chunked')
+            raise TranscodeError(f"Could not correct the DASH container: {stderr.strip() or returncode}")
+    os.replace(fixed, path)
+
+
+def chunked_size(ydl, selected, connections):
+    # Size of a stream worth fetching in byte ranges, or None to leave it to yt-dlp
+    if connections == 1 or selected.get('requested_formats') or selected.get('protocol') not in ('http', 'https'):
+        return None
+    size = selected.get('filesize')
+    if size and connection_count(connections, size) < 2:
+        return None
+    # A one byte request tells whether ranges are honoured and the exact size
+    try:
+        response = open_range(ydl, selected, 0, 0)
+    except Exception:
+        # yt-dlp reports the problem if the stream can't be downloaded at all
+        return None
+    response.close()
+    total = range_total(response)
+    if not total or connection_count(connections, total) < 2:
+        return None
+    return total
+
+
+def open_range(ydl, selected, start, end):
+    from yt_dlp.networking import Request
+    headers = {**(selected.get('http_headers') or {}), 'Range': f'bytes={start}-{end}'}
+    return ydl.urlopen(Request(selected['url'], headers=headers))
+
+
+def output_targets(source, filetypes):
+    base = source.rsplit(SOURCE_SUFFIX, 1)[0]
+    return [(f'{base}.{filetype}', filetype) for filetype in filetypes]
+
+
+def scratch_dir(job):
+    # Where a job's partial download, source file and conversions live until
+    # publish() moves the finished files to its save_path. One per job, so jobs
+    # with the same title, or the same video queued twice, never share files. The
+    # journal's id survives restarts, so a resumed job finds its partial download.
+    # Without a scratch directory it is a hidden folder in save_path, so publish()
+    # is a rename and still never replaces a file that is already there.
+    name = f'job-{job.journal_id}' if job.journal_id is not None else f'run-{os.getpid()}-{job.job_id}'
+    if not config.SCRATCH:
+        return os.path.join(job.save_path, f'.yt-to-local-{name}')
+    return os.path.join(config.SCRATCH_DIR, name)
+
+
+def publish(path, save_path):
+    # Moves a finished file into save_path and returns its new path. Anyone
+    # watching save_path only ever sees complete files: a rename within one
+    # filesystem, otherwise one sequential copy to a hidden name that is renamed
+    # once it is complete. An existing file is never replaced; the new one gets a
+    # free name like 'Title (2).mp3' instead.
+    name = os.path.basename(path)
+    if os.path.dirname(os.path.abspath(path)) == os.path.abspath(save_path):
+        return path
+    os.makedirs(save_path, exist_ok=True)
+    try:
+        return _move_to_free_name(path, save_path, name)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    partial = os.path.join(save_path, f'.{name}.{os.getpid()}-{threading.get_ident()}.part')
+    try:
+        shutil.copyfile(path, partial)
+        destination = _move_to_free_name(partial, save_path, name)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    os.remove(path)
+    return destination
+
+
+def _move_to_free_name(source, save_path, name):
+    # A hard link fails instead of replacing an existing file, so two jobs can't
+    # both take the same free name. Raises EXDEV when source is on another filesystem.
+    base, extension = os.path.splitext(name)
+    for number in itertools.count(1):
+        destination = os.path.join(save_path, name if number == 1 else f'{base} ({number}){extension}')
+        try:
+            os.link(source, destination)
+        except FileExistsError:
+            continue
+        except OSError as e:
+            if e.errno == errno.EXDEV:
+                raise
+            # No hard links on this filesystem (FAT, some network shares)
+            if os.path.lexists(destination):
+                continue
+            os.rename(source, destination)
+            return destination
+        os.remove(source)
+        return destination
+
+
+def remove_scratch_dir(job):
+    # Once it is empty; what a failed job leaves there stays for a retry
+    try:
+        os.rmdir(scratch_dir(job))
+    except OSError:
+        pass
+
+
+def remove_scratch_files(jobs):
+    # Jobs that won't be resumed: whatever they left in the scratch directory
+    for job in jobs:
+        shutil.rmtree(scratch_dir(job), ignore_errors=True)
+
+
+def remove_partial_files(job):
+    # The download and whatever yt-dlp or the chunked downloader kept next to it
+    # (.part, .part-FragN, .ytdl, .chunked, .chunked.list); converted files are removed by the transcoder
+    paths = [job.source_path]
+    if job.download_path:
+        paths += [job.download_path, f'{job.download_path}.ytdl']
+        paths += glob.glob(f'{glob.escape(job.download_path)}.part*')
+        paths += glob.glob(f'{glob.escape(job.download_path)}.chunked*')
+    for path in paths:
+        if path and os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError as e:
+                log.warning("Could not remove %s: %s", path, e)
+    remove_scratch_dir(job)
+
+
+class DownloadManager:
+    def __init__(self, max_workers=config.DOWNLOAD_WORKERS, on_update=None, journal=None, archive=None,
+                 stream_encode=config.STREAM_ENCODE):
+        # on_update(job) is called from worker threads whenever a job's state or progress changes
+        self.on_update = on_update or (lambda job: None)
+        self.journal = journal
+        self.archive = archive
+        self.stream_encode = stream_encode
+        self.jobs = {}
+        self.transcode_stage = TranscodeStage()
+        self.progress = ProgressAggregator()
+        self.bandwidth = BandwidthScheduler()
+        # Queued jobs start in priority order, then in the order they were submitted
+        self._queue = queue.PriorityQueue()
+        self._queue_order = itertools.count()
+        self._queued = {}  # job_id -> its current queue entry number
+        self._sequence = {}  # job_id -> its place among jobs of the same priority
+        self._lock = threading.Lock()
+        self._settled = threading.Condition(self._lock)
+        self._slots = threading.Semaphore(config.PLAYLIST_QUEUE_AHEAD)
+        self._slot_jobs = set()
+        self.max_workers = max_workers
+        self._busy = 0  # workers that are running a job
+        self._aborting = False
+        self._threads = []
+        for index in range(max_workers):
+            thread = threading.Thread(target=self._run, name=f'download-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def acquire_slot(self, cancelled=lambda: False):
+        # Called by playlist expansion before it submits an entry; the slot is
+        # released when the job submitted for that entry settles
+        while not self._slots.acquire(timeout=0.5):
+            if cancelled():
+                return False
+        return True
+
+    def submit(self, job, holds_slot=False):
+        if self.journal is not None and job.journal_id is None:
+            self.journal.add(job)  # recorded before any work starts
+        with self._lock:
+            self.jobs[job.job_id] = job
+            if holds_slot:
+                self._slot_jobs.add(job.job_id)
+        self._enqueue(job)  # picked up once a worker is free
+        self._preempt_for(job)
+        return job
+
+    def cancel(self, job):
+        # A queued job ends at once. A running one stops at its next progress
+        # update or network request, or its ffmpeg is terminated; its partial
+        # files are removed when it has stopped.
+        with self._lock:
+            if job.state in FINAL_STATES:
+                return
+            queued = self._queued.pop(job.job_id, None) is not None
+            job.stop_reason = CANCEL
+        self.bandwidth.stop(job)  # wakes it if it is waiting for its bandwidth share
+        if queued:
+            self._stopped(job)
+
+    def set_priority(self, job, priority):
+        # Reorders the job if it is still queued and changes its bandwidth share if it is running
+        self.bandwidth.set_priority(job, priority)
+        with self._lock:
+            queued = job.job_id in self._queued
+        if queued:
+            self._enqueue(job)
+            self._preempt_for(job)
+
+    def _preempt_for(self, job):
+        # A queued job that would wait behind lower priority downloads takes the
+        # place of one of them; that one goes back to the queue and later
+        # continues from its partial file
+        if not config.PREEMPT:
+            return
+        rank = PRIORITIES.index(job.priority)
+        with self._lock:
+            if self._busy < self.max_workers:
+                return
+            # A streamed download can't continue later, it would start over
+            running = [other for other in self.jobs.values() if other.state == DOWNLOADING and not other.streaming
+                       and other.stop_reason is None and PRIORITIES.index(other.priority) > rank]
+            if not running:
+                return
+            # Lowest priority first, then the one with the least to lose
+            victim = max(running, key=lambda other: (PRIORITIES.index(other.priority), -other.downloaded_bytes))
+            victim.stop_reason = PREEMPT
+        log.info("Job %s makes way for job %s", victim.job_id, job.job_id)
+        metrics.count('preemptions')
+        self.bandwidth.stop(victim)
+
+    def set_rate_limit(self, rate):
+        # Combined bytes per second for all downloads, 0 removes the cap
+        self.bandwidth.set_rate(rate)
+
+    def _enqueue(self, job):
+        with self._lock:
+            self._enqueue_locked(job)
+
+    def _enqueue_locked(self, job):
+        # A job put back after a preemption or a priority change keeps its place
+        # among the jobs of its priority; the entry number tells stale entries apart
+        sequence = self._sequence.setdefault(job.job_id, next(self._queue_order))
+        order = self._queued[job.job_id] = next(self._queue_order)
+        self._queue.put((PRIORITIES.index(job.priority), sequence, order, job))
+
+    def active_count(self):
+        return sum(1 for job in list(self.jobs.values()) if job.state in (DOWNLOADING, CONVERTING))
+
+    def pending_count(self):
+        return sum(1 for job in list(self.jobs.values()) if job.state not in FINAL_STATES)
+
+    def total_speed(self):
+        # Combined download rate of all running jobs, bytes per second
+        return self.progress.total_speed()
+
+    def wait(self):
+        with self._settled:
+            self._settled.wait_for(lambda: self.pending_count() == 0)
+
+    def shutdown(self, abort=False):
+        # With abort, running jobs stop where they are instead of being finished.
+        # They and the queued jobs stay in the journal with their partial files,
+        # so the next start resumes them.
+        if abort:
+            with self._lock:
+                self._aborting = True
+                running = [job for job in self.jobs.values() if job.state in ACTIVE_STATES]
+                for job in running:
+                    job.stop_reason = SHUTDOWN
+            for job in running:
+                self.bandwidth.stop(job)
+        for _ in self._threads:
+            # Sorts after every queued job, like the FIFO it replaced
+            self._queue.put((len(PRIORITIES), next(self._queue_order), 0, None))
+        for thread in self._threads:
+            thread.join()
+        self.transcode_stage.shutdown()
+
+    def _run(self):
+        while True:
+            _, _, order, job = self._queue.get()
+            if job is None or self._aborting:
+                return
+            with self._lock:
+                # A job whose priority changed while queued has a newer entry
+                if self._queued.get(job.job_id) != order:
+                    continue
+                del self._queued[job.job_id]
+                self._busy += 1
+            try:
+                self._download(job)
+            finally:
+                with self._lock:
+                    self._busy -= 1
+
+    def _download(self, job):
+        # Only produce the file types the archive doesn't already have; a
+        # set lookup per type, no network and no filesystem access
+        filetypes = self.archive.missing_filetypes(job) if self.archive is not None else list(job.filetypes)
+        if not filetypes:
+            self._set_state(job, SKIPPED)
+            return
+        if job.stop_reason is not None:
+            self._stopped(job)  # cancelled just as a worker picked it up
+            return
+
+        self._set_state(job, DOWNLOADING)
+
+        targets = None
+        if job.source_path is None or not os.path.exists(job.source_path):
+            progress_hook = lambda progress: self._progress_hook(job, progress)
+            self.bandwidth.start(job)
+            try:
+                if self.stream_encode:
+                    targets = stream_source(job, filetypes, progress_hook)
+                    if targets is None:
+                        # The file path starts counting again
+                        metrics.count('downloaded_bytes', self.progress.finish(job))
+                if targets is None:
+                    job.source_path = download_source(job, progress_hook)
+            except Exception as e:
+                self.bandwidth.stop(job)
+                metrics.count('downloaded_bytes', self.progress.finish(job))
+                if job.stop_reason is not None:
+                    self._stopped(job)
+                else:
+                    self._fail(job, f"An error occurred: {e}")
+                return
+            self.bandwidth.stop(job)
+            metrics.count('downloaded_bytes', self.progress.finish(job))
+            with self._lock:
+                if job.stop_reason == PREEMPT:
+                    job.stop_reason = None  # the download finished anyway
+            if job.stop_reason is not None and targets is None:
+                self._stopped(job)
+                return
+
+        job.progress = 100
+        if targets is not None:
+            self._transcode_done(job, targets, None)  # converted while it downloaded
+            return
+        self._set_state(job, CONVERTING)
+        # Returns as soon as the file is queued, freeing this worker for the next download
+        source = job.source_path
+        targets = output_targets(source, filetypes)
+        # Jobs resumed from a journal written before the codec was recorded fall back to the stream's
+        source_codec = job.source_codec or (job.selected_stream.acodec if job.selected_stream else None)
+        self.transcode_stage.submit(source, targets, lambda error: self._transcode_done(job, targets, error),
+                                    source_codec, job)
+
+    def _transcode_done(self, job, targets, error):
+        # A job that finished before noticing it was cancelled is kept
+        if error is not None and job.stop_reason is not None:
+            self._stopped(job)
+            return
+        if error is not None:
+            self._fail(job, f"Conversion failed: {error}")
+            return
+        try:
+            with metrics.span('move', job):
+                published = [(publish(target, job.save_path), codec) for target, codec in targets]
+        except OSError as e:
+            self._fail(job, f"Could not move the finished files to {job.save_path}: {e}")
+            return
+        remove_scratch_dir(job)
+        notes = [f"Saved as {os.path.basename(path)}, {os.path.basename(target)} already exists"
+                 for (target, _), (path, _) in zip(targets, published)
+                 if os.path.basename(path) != os.path.basename(target)]
+        if self.archive is not None:
+            try:
+                duplicates = self.archive.add(job, published)
+                if duplicates:
+                    notes.append(f"Same audio is already in the library: {', '.join(duplicates)}")
+            except Exception as e:
+                # The files are there; a broken archive must not fail the job
+                notes.append(f"Could not update the download archive: {e}")
+        if notes:
+            job.error = '; '.join(notes)
+        self._set_state(job, DONE)
+
+    def _progress_hook(self, job, progress):
+        if progress['status'] != 'downloading':
+            return
+        if job.download_path is None:
+            job.download_path = progress.get('filename')
+            # The format it picked, so a resumed job continues this download
+            self._journal_update(job)
+        if self.progress.update(job, progress):
+            self.on_update(job)
+        # Sleeps here while the job is over its share of the bandwidth cap
+        self.bandwidth.account(job, progress.get('downloaded_bytes'))
+        if job.stop_reason is not None:
+            # Raised out of the download by yt-dlp and by the chunked downloader
+            from yt_dlp.utils import DownloadCancelled
+            raise DownloadCancelled("Cancelled")
+
+    def _stopped(self, job):
+        # A job that was asked to stop has stopped
+        if job.stop_reason == PREEMPT:
+            self._set_state(job, QUEUED)
+            with self._lock:
+                # Unless it was cancelled meanwhile; cancel() only ends jobs it finds queued
+                requeued = job.stop_reason == PREEMPT
+                if requeued:
+                    job.stop_reason = None
+                    self._enqueue_locked(job)
+            if requeued:
+                return
+        if job.stop_reason == SHUTDOWN:
+            return  # left in the journal as it is
+        remove_partial_files(job)
+        self._set_state(job, CANCELLED)
+
+    def _fail(self, job, error):
+        job.error = error
+        self._set_state(job, FAILED)
+
+    def _journal_update(self, job):
+        if self.journal is not None:
+            try:
+                self.journal.update(job)
+            except Exception:
+                # The job still settles; at worst it is offered for resuming once too often
+                log.exception("Could not record job %s in the journal", job.job_id)
+
+    def _set_state(self, job, state):
+        job.state = state
+        self._journal_update(job)
+        self.on_update(job)
+        if state in FINAL_STATES:
+            metrics.count('jobs', state=state)
+            with self._settled:
+                self._sequence.pop(job.job_id, None)
+                if job.job_id in self._slot_jobs:
+                    self._slot_jobs.discard(job.job_id)
+                    self._slots.release()
+                self._settled.notify_all()
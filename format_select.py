@@ -0,0 +1,65 @@
+COPY = 'copy'
+REENCODE = 're-encode'
+
+# Codec each output file type holds
+TARGET_CODECS = {
+    'mp3': 'mp3',
+    'm4a': 'aac',
+    'opus': 'opus',
+    'wav': 'pcm',
+    'flac': 'flac',
+}
+
+# yt-dlp acodec prefixes of a codec, used in format selectors
+ACODEC_PREFIXES = {
+    'aac': 'mp4a',
+    'opus': 'opus',
+    'mp3': 'mp3',
+    'flac': 'flac',
+}
+
+
+def codec_family(acodec):
+    # 'mp4a.40.2' -> 'aac', 'opus' -> 'opus', 'pcm_s16le' -> 'pcm'
+    acodec = (acodec or '').lower()
+    if acodec.startswith(('mp4a', 'aac')):
+        return 'aac'
+    for family in ('opus', 'vorbis', 'mp3', 'flac', 'pcm'):
+        if acodec.startswith(family):
+            return family
+    return acodec or None
+
+
+def conversion(acodec, filetype):
+    # A stream already in the target codec only needs its container changed
+    family = codec_family(acodec)
+    return COPY if family is not None and family == TARGET_CODECS.get(filetype) else REENCODE
+
+
+def conversion_label(stream, filetypes):
+    conversions = [conversion(stream.acodec, filetype) for filetype in filetypes]
+    if len(set(conversions)) == 1:
+        return conversions[0]
+    return ", ".join(f"{kind} {filetype}" for filetype, kind in zip(filetypes, conversions))
+
+
+def stream_score(stream, filetypes):
+    # Fewer re-encodes first, then higher bitrate, then smaller download
+    copies = sum(conversion(stream.acodec, filetype) == COPY for filetype in filetypes)
+    return copies, float(stream.abr or 0), -(stream.size or 0)
+
+
+def rank_streams(streams, filetypes):
+    return sorted(streams, key=lambda stream: stream_score(stream, filetypes), reverse=True)
+
+
+def format_selector(filetypes, quality='best'):
+    # yt-dlp selector for jobs without a resolved stream (playlist entries),
+    # preferring formats that can be copied into the requested file types
+    if quality == 'worst':
+        return 'worstaudio/worst'
+    limit = '' if quality == 'best' else f'[abr<={quality}]'
+    preferred = [f'bestaudio[acodec^={ACODEC_PREFIXES[TARGET_CODECS[filetype]]}]{limit}'
+                 for filetype in filetypes if TARGET_CODECS.get(filetype) in ACODEC_PREFIXES]
+    fallback = ['bestaudio', 'best'] if quality == 'best' else [f'bestaudio{limit}', 'worstaudio', 'best']
+    return '/'.join(dict.fromkeys(preferred + fallback))
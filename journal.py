@@ -0,0 +1,104 @@
+import json
+import threading
+import time
+
+import config
+import db
+from download_job import DownloadJob, QUEUED, DOWNLOADING, CONVERTING, FINAL_STATES, NORMAL
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL,
+    title TEXT,
+    format TEXT NOT NULL,
+    filetypes TEXT NOT NULL,
+    save_path TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    source_path TEXT,
+    format_id TEXT,
+    source_codec TEXT,
+    priority TEXT,
+    connections INTEGER,
+    updated_at REAL NOT NULL
+);
+"""
+# Added after the first release; journals from before get them on open
+ADDED_COLUMNS = {'format_id': 'TEXT', 'source_codec': 'TEXT', 'priority': 'TEXT', 'connections': 'INTEGER'}
+
+UNFINISHED_STAGES = (QUEUED, DOWNLOADING, CONVERTING)
+
+
+class JobJournal:
+    # Write-ahead record of every job that hasn't finished yet. Rows are written
+    # before the job starts and on each stage change, and deleted once the job
+    # is done or failed, so whatever is left after a crash is exactly the work to resume.
+
+    def __init__(self, path=config.JOURNAL_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        # FULL sync: a stage change must survive a power loss, and there are only a few per job
+        self._conn = db.connect(path, synchronous='FULL')
+        self._conn.executescript(SCHEMA)
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(jobs)')}
+        for column, kind in ADDED_COLUMNS.items():
+            if column not in columns:
+                self._conn.execute(f'ALTER TABLE jobs ADD COLUMN {column} {kind}')
+
+    def add(self, job):
+        with self._lock:
+            cursor = self._conn.execute(
+                'INSERT INTO jobs (url, title, format, filetypes, save_path, stage, source_path, priority, '
+                'connections, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (job.url, job.title, job.format_selector, json.dumps(job.filetypes), job.save_path,
+                 job.state, job.source_path, job.priority, job.connections, time.time()))
+            job.journal_id = cursor.lastrowid
+
+    def update(self, job):
+        if job.journal_id is None:
+            return
+        with self._lock:
+            if job.state in FINAL_STATES:
+                self._conn.execute('DELETE FROM jobs WHERE id = ?', (job.journal_id,))
+            else:
+                self._conn.execute(
+                    'UPDATE jobs SET stage = ?, source_path = ?, format_id = ?, source_codec = ?, priority = ?, '
+                    'connections = ?, updated_at = ? WHERE id = ?',
+                    (job.state, job.source_path, job.format_id, job.source_codec, job.priority, job.connections,
+                     time.time(), job.journal_id))
+
+    def unfinished(self):
+        # Jobs left over by a previous run, rebuilt so they can be submitted again.
+        # The partial download (and a finished source file) is found again through
+        # the same output template, so yt-dlp continues it with a range request; a
+        # job that had picked a format asks for that one again instead of choosing anew.
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT id, url, title, format, filetypes, save_path, source_path, format_id, source_codec, '
+                'priority, connections FROM jobs '
+                f'WHERE stage IN ({", ".join("?" * len(UNFINISHED_STAGES))}) ORDER BY id',
+                UNFINISHED_STAGES).fetchall()
+
+        jobs = []
+        for (journal_id, url, title, format_selector, filetypes, save_path, source_path, format_id, source_codec,
+             priority, connections) in rows:
+            job = DownloadJob(url, None, None, json.loads(filetypes), save_path, title=title,
+                              format_selector=format_selector, connections=connections, priority=priority or NORMAL)
+            job.journal_id = journal_id
+            job.source_path = source_path
+            job.format_id = format_id
+            job.source_codec = source_codec
+            jobs.append(job)
+        return jobs
+
+    def discard(self, jobs):
+        with self._lock:
+            self._conn.executemany('DELETE FROM jobs WHERE id = ?', [(job.journal_id,) for job in jobs])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_journal():
+    return JobJournal() if config.JOURNAL else None
@@ -1,35 +1,61 @@
+import logging
 import os
 import subprocess
-import traceback
-from PyQt6 import uic
-from PyQt6.QtWidgets import QTextEdit, QMainWindow, QMessageBox, QFileDialog, QProgressBar, QPushButton, QLabel, QComboBox, QCheckBox
-from PyQt6.QtCore import QTimer
-from yt_dlp import YoutubeDL
+import threading
+from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtWidgets import QTextEdit, QMainWindow, QMessageBox, QFileDialog, QProgressBar, QPushButton, QLabel, QComboBox, QCheckBox, QTableWidget, QTableWidgetItem, QHeaderView, QSpinBox, QMenu
+import config
+import engine
 from url_finder_thread import URLFinderThread
-from download_thread import DownloadThread
+from playlist_thread import PlaylistExpanderThread
+from download_job import DownloadJob, DOWNLOADING, DONE, FAILED, SKIPPED, CANCELLED, FINAL_STATES, NORMAL, PRIORITIES
+from download_queue import DownloadQueue
+from format_select import codec_family, conversion_label, format_selector
+from progress import format_speed, format_eta
+from stall_watchdog import StallWatchdog
+
+UI_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.ui')
+
+FILETYPES = ['mp3', 'm4a', 'opus', 'wav', 'flac']
+
+(JOB_COLUMN_ID, JOB_COLUMN_TITLE, JOB_COLUMN_QUALITY, JOB_COLUMN_TYPE, JOB_COLUMN_STATE, JOB_COLUMN_PROGRESS,
+ JOB_COLUMN_SPEED, JOB_COLUMN_ETA) = range(8)
+
+log = logging.getLogger(__name__)
 
 class YouTubeDownloader(QMainWindow):
     def __init__(self):
         super().__init__()
-        uic.loadUi("main.ui", self)
+        self.setup_ui()
 
-        self.setFixedSize(813, 435)
+        self.setFixedSize(813, 540)
         self.save_path = None
         self.statusBar().showMessage("Ready")
         status_bar = self.statusBar()
-        self.url_finder = None
-
-        # Initialize buttons and add debug print statements
+        self.url_finder_thread = None
+        self.video_info = None
+        self.playlist = None
+        # Lookup of several pasted URLs; results come in while the user picks the settings
+        self.batch_urls = None
+        self.batch_found = []  # (url, info) resolved but not queued yet
+        self.batch_resolved = 0
+        self.batch_failed = {}  # url -> error message
+        self.batch_settings = None  # (filetypes, save path, priority) once Start was clicked
+        self.picked_stream = None  # format_id the user chose, kept when the file types change
+        self.playlist_threads = []
+        self.warm_up_started = False
+
+        # Initialize buttons
         self.find_button = self.findChild(QPushButton, 'search_url_button')
         self.download_button = self.findChild(QPushButton, 'start_download')
         self.choose_folder_button = self.findChild(QPushButton, 'save_path_button')
         self.open_folder_button = self.findChild(QPushButton, 'open_file_path')
 
-        # Debug: Print the types of the loaded UI components
-        print(f"Type of find_button: {type(self.find_button)}")
-        print(f"Type of download_button: {type(self.download_button)}")
-        print(f"Type of choose_folder_button: {type(self.choose_folder_button)}")
-        print(f"Type of open_folder_button: {type(self.open_folder_button)}")
+        # Debug: log the types of the loaded UI components
+        log.debug("Type of find_button: %s", type(self.find_button))
+        log.debug("Type of download_button: %s", type(self.download_button))
+        log.debug("Type of choose_folder_button: %s", type(self.choose_folder_button))
+        log.debug("Type of open_folder_button: %s", type(self.open_folder_button))
 
         # Ensure the components are properly instantiated
         if not isinstance(self.open_folder_button, QPushButton):
@@ -48,17 +74,47 @@ class YouTubeDownloader(QMainWindow):
         self.choosen_label_filetype_text = self.findChild(QLabel, 'selected_filetype_text')
         self.video_name_label = self.findChild(QLabel, 'video_name')
         self.video_name_text = self.findChild(QLabel, 'video_name_text')
-        self.progress_bar = self.findChild(QProgressBar, 'progressBar')
+        self.jobs_table = self.findChild(QTableWidget, 'jobs_table')
         self.progress_label = self.findChild(QLabel, 'download_progress_label')
         self.operation = self.findChild(QLabel, 'operation_text')
         self.status = self.findChild(QLabel, 'status_text')
 
         self.progress_label.setVisible(True)
+        self.jobs_table.verticalHeader().setVisible(False)
+        self.jobs_table.horizontalHeader().setSectionResizeMode(JOB_COLUMN_TITLE, QHeaderView.ResizeMode.Stretch)
+        self.job_rows = {}
+
+        self.download_queue = DownloadQueue(parent=self)
+        self.download_queue.job_added.connect(self.add_job_row)
+        self.download_queue.job_updated.connect(self.update_job_row)
+        if self.download_queue.resumable_jobs:
+            QTimer.singleShot(0, self.offer_resume)
+        self.speed_label = QLabel()
+        self.statusBar().addPermanentWidget(self.speed_label)
+        # Priority of the jobs added next; running jobs are changed from the list's context menu
+        self.priority_combo = QComboBox()
+        self.priority_combo.addItems(PRIORITIES)
+        self.priority_combo.setCurrentText(NORMAL)
+        self.priority_combo.setToolTip("Priority of new downloads")
+        self.statusBar().addPermanentWidget(self.priority_combo)
+        self.rate_limit_spin = QSpinBox()
+        self.rate_limit_spin.setRange(0, 1024 * 1024)
+        self.rate_limit_spin.setSingleStep(256)
+        self.rate_limit_spin.setSuffix(" KiB/s")
+        self.rate_limit_spin.setSpecialValueText("No limit")
+        self.rate_limit_spin.setToolTip("Combined download rate limit")
+        self.rate_limit_spin.setValue(config.BANDWIDTH_LIMIT // 1024)
+        self.rate_limit_spin.valueChanged.connect(lambda value: self.download_queue.set_rate_limit(value * 1024))
+        self.statusBar().addPermanentWidget(self.rate_limit_spin)
+        self.jobs_table.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.jobs_table.customContextMenuRequested.connect(self.show_job_menu)
         self.video_name_label.setVisible(False)
         self.video_name_text.setVisible(False)
 
         self.quality_combo.currentTextChanged.connect(self.update_quality_label)
-        self.filetype_combo.currentTextChanged.connect(self.update_filetype_label)
+        self.quality_combo.activated.connect(self.pick_stream)
+        # Filetype items are checkable; clicking one toggles it instead of replacing the selection
+        self.filetype_combo.view().pressed.connect(self.toggle_filetype)
 
         self.download_button.setVisible(False)
         self.open_folder_button.setVisible(False)
@@ -69,7 +125,7 @@ class YouTubeDownloader(QMainWindow):
         self.choose_folder_button.setVisible(False)
 
         # Ensure proper signal-slot connection
-        print("Connecting signals...")
+        log.debug("Connecting signals...")
         self.find_button.clicked.connect(self.find_video)
         self.download_button.clicked.connect(self.download)
         self.choose_folder_button.clicked.connect(self.choose_folder)
@@ -78,7 +134,56 @@ class YouTubeDownloader(QMainWindow):
         self.show_name_checkbox = self.findChild(QCheckBox, 'check_show_name')
         self.show_name_checkbox.stateChanged.connect(self.update_labels_visibility)
 
-        print("Initialization complete")
+        # Pasted links are looked up while the user is still choosing, see prefetch_urls
+        self.prefetcher = engine.Prefetcher() if config.PREFETCH else None
+        self.prefetch_timer = QTimer(self)
+        self.prefetch_timer.setSingleShot(True)
+        self.prefetch_timer.setInterval(int(config.PREFETCH_DELAY * 1000))
+        self.prefetch_timer.timeout.connect(self.prefetch_urls)
+        if self.prefetcher is not None:
+            self.url_input.textChanged.connect(self.url_text_changed)
+
+        # Started with the first paint, see paintEvent
+        self.watchdog = StallWatchdog() if config.STALL_THRESHOLD > 0 else None
+        self.watchdog_timer = QTimer(self)
+        self.watchdog_timer.setInterval(int(config.STALL_INTERVAL * 1000))
+        if self.watchdog is not None:
+            self.watchdog_timer.timeout.connect(self.watchdog.beat)
+
+        log.debug("Initialization complete")
+
+    def setup_ui(self):
+        # ui_main.py is generated from main.ui with:  python -m PyQt6.uic.pyuic main.ui -o ui_main.py
+        # and must be regenerated after editing main.ui. Parsing the XML on every launch
+        # is slow, so it is only a fallback (or YTL_UI_FROM_XML=1 while editing the form).
+        if not config.UI_FROM_XML:
+            try:
+                from ui_main import Ui_MainWindow
+                Ui_MainWindow().setupUi(self)
+                return
+            except ImportError:
+                pass
+        from PyQt6 import uic
+        uic.loadUi(UI_FILE, self)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.warm_up_started:
+            self.warm_up_started = True
+            # Once the window is on screen, load yt_dlp in the background so the first lookup doesn't pay for it
+            threading.Thread(target=engine.warm_up, name='warm-up', daemon=True).start()
+            if self.watchdog is not None:
+                self.watchdog.start()
+                self.watchdog_timer.start()
+
+    def offer_resume(self):
+        count = len(self.download_queue.resumable_jobs)
+        answer = QMessageBox.question(self, "Resume Downloads",
+                                      f"{count} download(s) did not finish last time. Resume them?")
+        if answer == QMessageBox.StandardButton.Yes:
+            self.download_queue.resume()
+        else:
+            self.download_queue.discard_resumable()
 
     def open_save_path(self):
         if self.save_path and os.path.exists(self.save_path):
@@ -86,6 +191,18 @@ class YouTubeDownloader(QMainWindow):
         else:
             QMessageBox.warning(self, "Warning", "Invalid or empty save path.")
 
+    def url_text_changed(self):
+        # Lookups for the old text that haven't started are dropped; restarting
+        # the timer waits until typing or pasting has stopped
+        self.prefetcher.cancel()
+        self.prefetch_timer.start()
+
+    def prefetch_urls(self):
+        urls = [url for url in engine.parse_urls(self.url_input.toPlainText()) if engine.looks_like_url(url)]
+        if urls:
+            log.debug("Prefetching %s", urls)
+            self.prefetcher.prefetch(urls)
+
     def update_labels_visibility(self):
         if self.show_name_checkbox.isChecked():
             self.video_name_label.setVisible(True)
@@ -97,78 +214,257 @@ class YouTubeDownloader(QMainWindow):
     def update_quality_label(self, text):
         self.choosen_label_quality_text.setText(text)
 
-    def update_filetype_label(self, text):
-        self.choosen_label_filetype_text.setText(text)
-
-    def update_download_progress(self, progress):
-        print("Progress received:", progress)  # Debugging
-        self.progress_bar.setValue(progress)
-        if progress == 100:
-            self.download_finished()
-            QMessageBox.information(self,"Download Finished", "You Can Open Your Save Path By Clicking ""Open Save PATH")
-
-    def download_finished(self):
-        print("Download finished")
-        self.statusBar().showMessage("Download finished")
-        self.progress_bar.setValue(0)
-        self.operation.setText("No Op.")
+    def populate_filetypes(self):
+        self.filetype_combo.clear()
+        self.filetype_combo.addItems(FILETYPES)
+        model = self.filetype_combo.model()
+        for row in range(model.rowCount()):
+            item = model.item(row)
+            item.setFlags(Qt.ItemFlag.ItemIsUserCheckable | Qt.ItemFlag.ItemIsEnabled)
+            item.setCheckState(Qt.CheckState.Checked if row == 0 else Qt.CheckState.Unchecked)
+        self.update_filetype_label()
+
+    def toggle_filetype(self, index):
+        item = self.filetype_combo.model().itemFromIndex(index)
+        if item.checkState() == Qt.CheckState.Checked:
+            item.setCheckState(Qt.CheckState.Unchecked)
+        else:
+            item.setCheckState(Qt.CheckState.Checked)
+        self.update_filetype_label()
+        if self.video_info is not None and self.playlist is None:
+            self.populate_streams()
+
+    def pick_stream(self, index):
+        stream = self.quality_combo.itemData(index)
+        self.picked_stream = stream.format_id if stream else None
+
+    def populate_streams(self):
+        # Streams that can be copied into the checked file types come first, each
+        # entry says whether it is copied or re-encoded
+        filetypes = self.checked_filetypes()
+        self.quality_combo.clear()
+        for stream in engine.audio_streams(self.video_info, filetypes):
+            label = f"{stream.abr} kbps {codec_family(stream.acodec)}"
+            if filetypes:
+                label += f" ({conversion_label(stream, filetypes)})"
+            self.quality_combo.addItem(label, stream)
+            if stream.format_id == self.picked_stream:
+                self.quality_combo.setCurrentIndex(self.quality_combo.count() - 1)
+
+    def checked_filetypes(self):
+        model = self.filetype_combo.model()
+        return [model.item(row).text() for row in range(model.rowCount())
+                if model.item(row).checkState() == Qt.CheckState.Checked]
+
+    def update_filetype_label(self):
+        self.choosen_label_filetype_text.setText(", ".join(self.checked_filetypes()) or "None")
+
+    def add_job_row(self, job):
+        row = self.jobs_table.rowCount()
+        self.jobs_table.insertRow(row)
+        self.job_rows[job.job_id] = row
+        id_item = QTableWidgetItem(str(job.job_id))
+        id_item.setData(Qt.ItemDataRole.UserRole, job)
+        self.jobs_table.setItem(row, JOB_COLUMN_ID, id_item)
+        self.jobs_table.setItem(row, JOB_COLUMN_TITLE, QTableWidgetItem(job.title))
+        self.jobs_table.setItem(row, JOB_COLUMN_QUALITY, QTableWidgetItem(job.quality))
+        self.jobs_table.setItem(row, JOB_COLUMN_TYPE, QTableWidgetItem(", ".join(job.filetypes)))
+        self.jobs_table.setItem(row, JOB_COLUMN_STATE, QTableWidgetItem(job.state))
+        progress_bar = QProgressBar()
+        progress_bar.setValue(job.progress)
+        self.jobs_table.setCellWidget(row, JOB_COLUMN_PROGRESS, progress_bar)
+        self.jobs_table.setItem(row, JOB_COLUMN_SPEED, QTableWidgetItem(""))
+        self.jobs_table.setItem(row, JOB_COLUMN_ETA, QTableWidgetItem(""))
+        self.update_operation()
+
+    def show_job_menu(self, position):
+        item = self.jobs_table.itemAt(position)
+        if item is None:
+            return
+        job = self.jobs_table.item(item.row(), JOB_COLUMN_ID).data(Qt.ItemDataRole.UserRole)
+        menu = QMenu(self)
+        for priority in PRIORITIES:
+            action = menu.addAction(f"Priority: {priority}")
+            action.setCheckable(True)
+            action.setChecked(job.priority == priority)
+            action.triggered.connect(lambda checked, priority=priority: self.download_queue.set_priority(job, priority))
+        menu.addSeparator()
+        cancel_action = menu.addAction("Cancel")
+        cancel_action.setEnabled(job.state not in FINAL_STATES)
+        cancel_action.triggered.connect(lambda: self.download_queue.cancel(job))
+        menu.exec(self.jobs_table.viewport().mapToGlobal(position))
+
+    def update_job_row(self, job):
+        row = self.job_rows[job.job_id]
+        state_item = self.jobs_table.item(row, JOB_COLUMN_STATE)
+        state_item.setText(job.state)
+        state_item.setToolTip(job.error or "")
+        self.jobs_table.cellWidget(row, JOB_COLUMN_PROGRESS).setValue(job.progress)
+        downloading = job.state == DOWNLOADING
+        self.jobs_table.item(row, JOB_COLUMN_SPEED).setText(format_speed(job.speed) if downloading else "")
+        self.jobs_table.item(row, JOB_COLUMN_ETA).setText(format_eta(job.eta) if downloading else "")
+        if job.state == DONE:
+            self.download_finished(job)
+        elif job.state == FAILED:
+            self.statusBar().showMessage(f"Job {job.job_id} failed: {job.error}")
+        elif job.state == SKIPPED:
+            self.statusBar().showMessage(f"Already downloaded: {job.title}")
+        elif job.state == CANCELLED:
+            self.statusBar().showMessage(f"Cancelled: {job.title}")
+        self.update_operation()
+
+    def update_operation(self):
+        active = self.download_queue.active_count()
+        self.speed_label.setText(format_speed(self.download_queue.total_speed()) if active else "")
+        if active:
+            self.operation.setText("Downloading...")
+        elif self.download_queue.pending_count():
+            self.operation.setText("Queued")
+        else:
+            self.operation.setText("No Op.")
+
+    def download_finished(self, job):
+        log.debug("Download finished: %s", job.url)
+        self.statusBar().showMessage(f"Download finished: {job.title}")
         self.open_folder_button.setVisible(True)
-        self.download_button.setEnabled(True)
 
     def find_video(self):
-        print("Find video button clicked")  # Initial debug print
+        log.debug("Find video button clicked")
 
         self.status.setText("Non-Ready")
-        url = self.url_input.toPlainText().strip()
-        print(f"URL from input: {url}")
+        urls = engine.parse_urls(self.url_input.toPlainText())
+        log.debug("URLs from input: %s", urls)
+        if self.url_finder_thread is not None:
+            # Results of an earlier lookup still running are ignored from now on
+            self.url_finder_thread.requestInterruption()
 
         self.statusBar().showMessage("Finding URL...")
-        self.url_finder_thread = URLFinderThread(self.url_input, self.statusBar())
+        self.url_finder_thread = URLFinderThread(urls)
+        self.url_finder_thread.status.connect(self.statusBar().showMessage)
         self.url_finder_thread.found_url.connect(self.handle_url_found)
-        self.url_finder_thread.started.connect(self.start_status_check)  
-        self.url_finder_thread.finished.connect(self.stop_status_check)
+        self.url_finder_thread.found_playlist.connect(self.handle_playlist_found)
+        self.url_finder_thread.resolved.connect(self.handle_batch_resolved)
+        self.url_finder_thread.resolve_failed.connect(self.handle_batch_failed)
+        self.url_finder_thread.finished.connect(self.url_finder_finished)
         self.url_finder_thread.finished.connect(self.url_finder_thread.deleteLater)
+        if len(urls) > 1:
+            self.start_batch(urls)
         self.url_finder_thread.start()
-        
-        self.status_timer = QTimer(self)
-        self.status_timer.timeout.connect(self.check_ydl_status)
 
-    def start_status_check(self):
-        self.status_timer.start(100)  # Check every 100 milliseconds
+    def url_finder_finished(self):
+        if self.sender() is not self.url_finder_thread:
+            return
+        self.url_finder_thread = None
+        if self.batch_urls is not None:
+            self.statusBar().showMessage(f"Lookup finished: {self.batch_summary()}")
+        else:
+            self.statusBar().showMessage("Ready")
+
+    def start_batch(self, urls):
+        self.video_info = None
+        self.playlist = None
+        self.batch_urls = urls
+        self.batch_found = []
+        self.batch_resolved = 0
+        self.batch_failed = {}
+        self.batch_settings = None
+
+        # Like playlists, every video is downloaded in the best audio for the chosen file types
+        self.quality_combo.clear()
+        self.quality_combo.addItem(f"Best audio ({len(urls)} links)", None)
+        self.populate_filetypes()
+        self.update_batch_label()
+
+        self.quality_combo.setVisible(True)
+        self.filetype_combo.setVisible(True)
+        self.download_button.setVisible(True)
+        self.quality_label.setVisible(True)
+        self.filetype_label.setVisible(True)
+        self.choose_folder_button.setVisible(True)
+        self.operation.setText("None")
+        self.statusBar().showMessage(f"Looking up {len(urls)} links...")
+
+    def batch_summary(self):
+        summary = f"{self.batch_resolved} of {len(self.batch_urls)} found"
+        return summary + (f", {len(self.batch_failed)} failed" if self.batch_failed else "")
+
+    def update_batch_label(self):
+        self.video_name_text.setText(self.batch_summary())
+        self.video_name_text.setToolTip("\n".join(f"{url}: {error}" for url, error in self.batch_failed.items()))
+
+    def handle_batch_resolved(self, url, info):
+        if self.sender() is not self.url_finder_thread:
+            return
+        self.batch_resolved += 1
+        if self.batch_settings is not None:
+            self.queue_batch_entry(url, info)  # Start was already clicked
+        else:
+            self.batch_found.append((url, info))
+        self.update_batch_label()
 
-    def stop_status_check(self):
-        self.status_timer.stop()
-        self.statusBar().showMessage("Ready")
+    def handle_batch_failed(self, url, error):
+        if self.sender() is not self.url_finder_thread:
+            return
+        self.batch_failed[url] = error
+        self.update_batch_label()
+        self.statusBar().showMessage(f"Could not resolve {url}: {error}")
+
+    def queue_batch(self, filetypes):
+        self.batch_settings = (filetypes, self.save_path, self.priority_combo.currentText())
+        for url, info in self.batch_found:
+            self.queue_batch_entry(url, info)
+        self.batch_found = []
+        self.statusBar().showMessage(f"Queued: {self.batch_summary()}")
+
+    def queue_batch_entry(self, url, info):
+        filetypes, save_path, priority = self.batch_settings
+        if engine.is_playlist(info):
+            self.expand_playlist(info['webpage_url'], filetypes)
+            return
+        self.download_queue.submit(DownloadJob(url, info, None, filetypes, save_path,
+                                               format_selector=format_selector(filetypes), priority=priority))
 
-    def check_ydl_status(self):
-        # No need to change the message here, as it's set in the run method of URLFinderThread
-        if not self.url_finder_thread.isRunning():
-            self.status_timer.stop()
-            if self.url_finder_thread.info is not None:
-                self.handle_url_found(True)
-            else:
-                self.handle_url_found(False)
-    
-    def handle_url_found(self, url_found):
-        if url_found:
+    def handle_playlist_found(self, playlist):
+        if self.sender() is not self.url_finder_thread:
+            return
+        self.video_info = None
+        self.playlist = playlist
+        self.batch_urls = None
+        self.video_name_text.setToolTip("")
+        self.video_name_text.setText(playlist['title'])
+
+        # Entries are resolved one by one while downloading, so only "best" makes sense here
+        self.quality_combo.clear()
+        self.quality_combo.addItem("Best audio (playlist)", None)
+
+        self.populate_filetypes()
+
+        self.quality_combo.setVisible(True)
+        self.filetype_combo.setVisible(True)
+        self.download_button.setVisible(True)
+        self.quality_label.setVisible(True)
+        self.filetype_label.setVisible(True)
+        self.choose_folder_button.setVisible(True)
+        self.choosen_folder_status.setText("Folder Not Selected")
+        self.operation.setText("None")
+        self.statusBar().showMessage("Playlist Found")
+
+    def handle_url_found(self, info):
+        if self.sender() is not self.url_finder_thread:
+            return
+        self.video_info = info
+        self.playlist = None
+        self.batch_urls = None
+        self.video_name_text.setToolTip("")
+        self.picked_stream = None
+        if info is not None:
             try:
-                url = self.url_input.toPlainText().strip()
-                with YoutubeDL({'quiet': True}) as ydl:
-                    info = ydl.extract_info(url, download=False)
-                    audio_streams = [stream for stream in info['formats'] if 'acodec' in stream and stream['acodec'] != 'none']
-                    video_title = info.get('title', 'Unknown')
-                    self.video_name_text.setText(video_title) 
+                video_title = info.get('title', 'Unknown')
+                self.video_name_text.setText(video_title) 
 
                 self.quality_combo.clear()
-                audio_streams = sorted(audio_streams, key=lambda x: float(x['abr']) if 'abr' in x and isinstance(x['abr'], str) else float('inf'))
-                for stream in reversed(audio_streams):
-                    if 'abr' in stream and stream['abr']:  
-                        quality_info = f"{stream['abr']} kbps"
-                        self.quality_combo.addItem(quality_info, stream)
-
-                filetypes = ['mp3', 'wav', 'flac']  
-                self.filetype_combo.clear()
-                self.filetype_combo.addItems(filetypes)
+                self.populate_filetypes()
+                self.populate_streams()
                 
                 self.quality_combo.setVisible(True)
                 self.filetype_combo.setVisible(True)
@@ -198,11 +494,13 @@ class YouTubeDownloader(QMainWindow):
 
     def download(self):
         self.download_button.setEnabled(False)
-        print("called download")
-        url = self.url_input.toPlainText().strip()
-        if not url:
+        log.debug("called download")
+        urls = engine.parse_urls(self.url_input.toPlainText())
+        if not urls:
             self.statusBar().showMessage("Please enter a YouTube URL")
+            self.download_button.setEnabled(True)
             return
+        url = urls[0]
 
         if not self.save_path:
             QMessageBox.critical(self, "Error", "Please choose a save path.")
@@ -214,37 +512,82 @@ class YouTubeDownloader(QMainWindow):
             self.download_button.setEnabled(True)
             return
 
+        filetypes = self.checked_filetypes()
+        if not filetypes:
+            QMessageBox.critical(self, "Error", "Please select at least one file type.")
+            self.download_button.setEnabled(True)
+            return
+
         if self.save_path and not self.quality_combo.currentIndex() == -1:
             self.status.setText("Ready")
 
-        try:
-            with YoutubeDL({'quiet': True}) as ydl:
-                print(ydl.extract_info(url, download=False))
+        if self.playlist is not None:
+            self.expand_playlist(self.playlist['webpage_url'], filetypes)
+            self.download_button.setEnabled(True)
+            return
+
+        if self.batch_urls is not None:
+            if self.batch_settings is not None:
+                self.statusBar().showMessage("These links are already queued")
+            else:
+                self.queue_batch(filetypes)
+            self.download_button.setEnabled(True)
+            return
 
+        try:
             selected_stream = self.quality_combo.currentData()
-            print("Selected stream from combo box:", selected_stream)  # Debugging
-            print("Type of selected stream from combo box:", type(selected_stream))  # Debugging
+            log.debug("Selected stream from combo box: %s", selected_stream)
 
             if selected_stream:
-                self.operation.setText("Downloading...")
-
-                filetype = self.filetype_combo.currentText()
-
-                self.download_thread = DownloadThread(
-                    self.download_button, self.operation, self.status, self.statusBar(), url, selected_stream, filetype, self.save_path
-                )
-                self.download_thread.download_progress.connect(self.update_download_progress)
-                self.download_thread.download_finished.connect(self.download_finished)
-                self.download_thread.start()
-                print("download started")
+                job = DownloadJob(url, self.video_info, selected_stream, filetypes, self.save_path,
+                                  priority=self.priority_combo.currentText())
+                self.download_queue.submit(job)
+                log.debug("download queued: job %s", job.job_id)
 
             else:
                 self.statusBar().showMessage("Error: No stream selected")
 
         except Exception as e:
             self.statusBar().showMessage("Error: " + str(e))
-            print(traceback.format_exc())
+            log.exception("Could not queue the download")
+        finally:
+            # Jobs run in the background, more can be queued right away
+            self.download_button.setEnabled(True)
     
+    def expand_playlist(self, url, filetypes):
+        save_path = self.save_path
+        priority = self.priority_combo.currentText()
+        expander = PlaylistExpanderThread(url, self.download_queue)
+        expander.entry_found.connect(
+            lambda entry_url, title: self.download_queue.submit(
+                DownloadJob(entry_url, None, None, filetypes, save_path, title=title,
+                            format_selector=format_selector(filetypes), priority=priority), holds_slot=True))
+        expander.error_signal.connect(self.statusBar().showMessage)
+        expander.expansion_finished.connect(lambda count: self.playlist_expanded(expander, count))
+        self.playlist_threads.append(expander)
+        expander.start()
+        self.statusBar().showMessage("Expanding playlist...")
+
+    def playlist_expanded(self, expander, count):
+        self.statusBar().showMessage(f"Playlist expanded: {count} videos queued")
+        expander.wait()
+        self.playlist_threads.remove(expander)
+
+    def closeEvent(self, event):
+        if self.watchdog is not None:
+            self.watchdog_timer.stop()
+            self.watchdog.stop()
+        if self.prefetcher is not None:
+            self.prefetcher.shutdown()
+        if self.url_finder_thread is not None:
+            self.url_finder_thread.requestInterruption()
+            self.url_finder_thread.wait()
+        for expander in self.playlist_threads:
+            expander.requestInterruption()
+            expander.wait()
+        self.download_queue.shutdown()
+        super().closeEvent(event)
+
     def choose_folder(self):
         folder = QFileDialog.getExistingDirectory(self, "Select Directory")
         if folder:
@@ -0,0 +1,119 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse, parse_qs
+
+import config
+from metadata_store import MetadataStore, info_expiry, urls_expired
+
+_YOUTUBE_ID_RE = re.compile(r'^[0-9A-Za-z_-]{11}$')
+_YOUTUBE_PATH_PREFIXES = ('shorts', 'embed', 'live', 'v')
+
+
+def video_id_from_url(url):
+    parsed = urlparse(url.strip())
+    host = (parsed.hostname or '').lower()
+    video_id = None
+
+    if host == 'youtu.be':
+        video_id = parsed.path.strip('/').split('/')[0]
+    elif host == 'youtube.com' or host.endswith('.youtube.com') or host.endswith('youtube-nocookie.com'):
+        if parsed.path == '/watch':
+            video_id = parse_qs(parsed.query).get('v', [None])[0]
+        else:
+            parts = parsed.path.strip('/').split('/')
+            if len(parts) >= 2 and parts[0] in _YOUTUBE_PATH_PREFIXES:
+                video_id = parts[1]
+
+    if video_id and _YOUTUBE_ID_RE.match(video_id):
+        return video_id
+    return None
+
+
+def cache_key(url):
+    # youtu.be/ID, watch?v=ID&t=30 and shorts/ID all map to the same entry
+    video_id = video_id_from_url(url)
+    if video_id:
+        return f'youtube:{video_id}'
+    return url.strip()
+
+
+def info_cache_key(info):
+    # The generic extractor's ids are file names, the same on every host
+    if info.get('id') and info.get('extractor_key') and info['extractor_key'] != 'Generic':
+        return f"{info['extractor_key'].lower()}:{info['id']}"
+    return None
+
+
+class MetadataCache:
+    def __init__(self, max_entries=config.METADATA_CACHE_SIZE, ttl=config.METADATA_CACHE_TTL, store=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.store = store
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, url, allow_stale=False):
+        # allow_stale returns metadata whose stream URLs have expired; good enough
+        # to show titles and formats, but the URLs must be refreshed before downloading
+        info = self._get_memory(url)
+        if info is None and self.store is not None:
+            info = self.store.get(cache_key(url))
+            if info is not None:
+                self._remember(url, info)
+        if info is None or (urls_expired(info) and not allow_stale):
+            return None
+        return info
+
+    def _get_memory(self, url):
+        key = cache_key(url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, info = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return info
+
+    def put(self, url, info):
+        info['__expires_at'] = info_expiry(info)
+        keys = self._remember(url, info)
+        if self.store is not None:
+            self.store.put(keys, info)
+
+    def _remember(self, url, info):
+        keys = [cache_key(url)]
+        info_key = info_cache_key(info)
+        if info_key and info_key not in keys:
+            keys.insert(0, info_key)
+
+        entry = (time.monotonic(), info)
+        with self._lock:
+            for key in keys:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return keys
+
+    def invalidate(self, url):
+        with self._lock:
+            entry = self._entries.pop(cache_key(url), None)
+            if entry is not None:
+                info_key = info_cache_key(entry[1])
+                if info_key:
+                    self._entries.pop(info_key, None)
+        if self.store is not None:
+            self.store.expire(cache_key(url))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Shared by the finder thread, the main window and the download threads
+metadata_cache = MetadataCache(store=MetadataStore() if config.METADATA_STORE else None)
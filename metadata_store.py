@@ -0,0 +1,140 @@
+import json
+import re
+import threading
+import time
+from urllib.parse import urlparse, parse_qs
+
+import config
+import db
+
+# Top-level info fields kept on disk; everything else is re-extracted on demand
+INFO_FIELDS = ('id', 'title', 'duration', 'webpage_url', 'extractor', 'extractor_key', 'uploader', 'channel')
+
+_PATH_EXPIRE_RE = re.compile(r'/expire/(\d+)')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    key TEXT PRIMARY KEY,
+    title TEXT,
+    duration REAL,
+    info TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS aliases (
+    alias TEXT PRIMARY KEY,
+    key TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS formats (
+    key TEXT NOT NULL,
+    format_id TEXT NOT NULL,
+    acodec TEXT,
+    abr REAL,
+    ext TEXT,
+    data TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (key, format_id)
+);
+"""
+
+
+def audio_formats(info):
+    return [stream for stream in info.get('formats') or [] if 'acodec' in stream and stream['acodec'] != 'none']
+
+
+def format_expiry(stream, fetched_at):
+    # googlevideo URLs are signed until the unix time in their expire parameter
+    for field in ('url', 'manifest_url', 'fragment_base_url'):
+        url = stream.get(field)
+        if not url:
+            continue
+        expire = parse_qs(urlparse(url).query).get('expire')
+        if expire and expire[0].isdigit():
+            return float(expire[0])
+        match = _PATH_EXPIRE_RE.search(url)
+        if match:
+            return float(match.group(1))
+    return fetched_at + config.FORMAT_URL_TTL
+
+
+def info_expiry(info, fetched_at=None):
+    if fetched_at is None:
+        fetched_at = time.time()
+    expiries = [format_expiry(stream, fetched_at) for stream in audio_formats(info)]
+    return min(expiries) if expiries else fetched_at + config.FORMAT_URL_TTL
+
+
+def urls_expired(info):
+    expires_at = info.get('__expires_at')
+    if expires_at is None:
+        return False
+    return expires_at - config.FORMAT_URL_MARGIN <= time.time()
+
+
+class MetadataStore:
+    def __init__(self, path=config.METADATA_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = db.connect(path)
+        self._conn.executescript(SCHEMA)
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT v.key, v.info, v.expires_at FROM videos v '
+                'LEFT JOIN aliases a ON a.key = v.key '
+                'WHERE v.key = ? OR a.alias = ? LIMIT 1', (key, key)).fetchone()
+            if row is None:
+                return None
+            video_key, info_json, expires_at = row
+            format_rows = self._conn.execute(
+                'SELECT data FROM formats WHERE key = ?', (video_key,)).fetchall()
+
+        info = json.loads(info_json)
+        info['_type'] = 'video'
+        info['formats'] = [json.loads(data) for data, in format_rows]
+        info['__expires_at'] = expires_at
+        return info
+
+    def put(self, keys, info):
+        keys = list(keys)
+        video_key = keys[0]
+        fetched_at = time.time()
+
+        format_rows = []
+        for stream in audio_formats(info):
+            try:
+                data = json.dumps(stream)
+            except (TypeError, ValueError):
+                # Lazily generated fragment lists can't be stored; re-extract those instead
+                continue
+            format_rows.append((video_key, str(stream.get('format_id')), stream.get('acodec'),
+                                stream.get('abr'), stream.get('ext'), data, format_expiry(stream, fetched_at)))
+        if not format_rows:
+            return
+
+        slim_info = {field: info[field] for field in INFO_FIELDS if info.get(field) is not None}
+        expires_at = min(row[-1] for row in format_rows)
+
+        with self._lock:
+            with self._conn:
+                self._conn.execute('BEGIN')
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO videos (key, title, duration, info, fetched_at, expires_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (video_key, info.get('title'), info.get('duration'), json.dumps(slim_info), fetched_at, expires_at))
+                # Metadata stays, the format rows and their signed URLs are replaced
+                self._conn.execute('DELETE FROM formats WHERE key = ?', (video_key,))
+                self._conn.executemany('INSERT INTO formats VALUES (?, ?, ?, ?, ?, ?, ?)', format_rows)
+                self._conn.executemany('INSERT OR REPLACE INTO aliases (alias, key) VALUES (?, ?)',
+                                       [(alias, video_key) for alias in keys[1:]])
+
+    def expire(self, key):
+        with self._lock:
+            self._conn.execute(
+                'UPDATE videos SET expires_at = 0 WHERE key = ? OR key = (SELECT key FROM aliases WHERE alias = ?)',
+                (key, key))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,191 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import config
+
+# Timing spans for the stages a job goes through (resolve, select, download,
+# postprocess, move) and counters for bytes, retries and failures. Each span can
+# be appended to a JSON lines log when it ends, and the totals are written as a
+# Prometheus text file that node exporter's textfile collector picks up.
+
+STAGES = ('resolve', 'select', 'download', 'postprocess', 'move')
+# Upper bounds of the duration histogram buckets, in seconds
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+PREFIX = 'ytl_'
+COUNTERS = {
+    'downloaded_bytes': "Bytes received from the network.",
+    'retries': "Downloads and byte ranges that were started again.",
+    'failures': "Stages that ended with an error.",
+    'stopped': "Stages cut short because their job was cancelled, preempted or shut down.",
+    'stream_fallbacks': "Streamed downloads that failed and were downloaded to a file instead.",
+    'jobs': "Jobs that reached a final state.",
+    'preemptions': "Downloads sent back to the queue for a higher priority job.",
+    'ui_stalls': "Times the GUI event loop was blocked for longer than the stall threshold.",
+    'ui_stall_seconds': "Time the GUI event loop spent blocked in those stalls.",
+}
+
+log = logging.getLogger(__name__)
+
+
+class _Histogram:
+    __slots__ = ('buckets', 'count', 'sum')
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)  # cumulative, like Prometheus buckets
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        for index, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[index] += 1
+        self.count += 1
+        self.sum += seconds
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+class Metrics:
+    # Cheap enough to call from progress hooks: recording is a dict update under
+    # a lock. The JSON lines log is line buffered; the Prometheus file is written
+    # by a background thread at most every interval seconds, and once more at exit.
+
+    def __init__(self, log_path=config.METRICS_LOG, prom_path=config.METRICS_PROM,
+                 interval=config.METRICS_INTERVAL):
+        self.log_path = log_path
+        self.prom_path = prom_path
+        self.interval = interval
+        self._durations = {}  # stage -> _Histogram
+        self._counters = {}  # (name, ((label, value), ...)) -> total
+        self._lock = threading.Lock()
+        self._log_file = None
+        self._writer = None
+        self._dirty = False
+
+    @contextmanager
+    def span(self, stage, job=None, url=None, cancelled=None):
+        # An error raised because the job was told to stop, or after cancelled()
+        # returned true, is counted as stopped instead of as a failure
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            stopped = (job is not None and job.stop_reason is not None) or (cancelled is not None and cancelled())
+            self.record(stage, time.perf_counter() - start, job, url, error=e, stopped=stopped)
+            raise
+        self.record(stage, time.perf_counter() - start, job, url)
+
+    def record(self, stage, seconds, job=None, url=None, error=None, stopped=False):
+        with self._lock:
+            self._durations.setdefault(stage, _Histogram()).observe(seconds)
+            if stopped:
+                self._add('stopped', 1, {'stage': stage})
+            elif error is not None:
+                self._add('failures', 1, {'stage': stage})
+            if self.log_path:
+                event = {'time': round(time.time(), 3), 'stage': stage, 'seconds': round(seconds, 4)}
+                if job is not None:
+                    event['job'] = job.job_id
+                url = url or (job.url if job is not None else None)
+                if url:
+                    event['url'] = url
+                if stopped:
+                    event['stopped'] = True
+                elif error is not None:
+                    event['error'] = str(error)
+                self._write_event(event)
+        self._changed()
+
+    def count(self, name, value=1, **labels):
+        with self._lock:
+            self._add(name, value, labels)
+        self._changed()
+
+    def summary(self):
+        # {stage: {'count': n, 'seconds': total}}, for benchmarks and reports
+        with self._lock:
+            return {stage: {'count': histogram.count, 'seconds': histogram.sum}
+                    for stage, histogram in self._durations.items()}
+
+    def prometheus(self):
+        with self._lock:
+            durations = {stage: (list(h.buckets), h.count, h.sum) for stage, h in self._durations.items()}
+            counters = dict(self._counters)
+
+        name = f'{PREFIX}stage_duration_seconds'
+        lines = [f'# HELP {name} Time spent in each stage of a job.', f'# TYPE {name} histogram']
+        for stage, (buckets, count, total) in sorted(durations.items()):
+            for bound, value in zip(BUCKETS, buckets):
+                lines.append(f'{name}_bucket{_labels((("stage", stage), ("le", bound)))} {value}')
+            lines.append(f'{name}_bucket{_labels((("stage", stage), ("le", "+Inf")))} {count}')
+            lines.append(f'{name}_sum{_labels((("stage", stage),))} {total}')
+            lines.append(f'{name}_count{_labels((("stage", stage),))} {count}')
+        for counter, help_text in COUNTERS.items():
+            name = f'{PREFIX}{counter}_total'
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+            for (key, labels), value in sorted(counters.items()):
+                if key == counter:
+                    lines.append(f'{name}{_labels(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path=None):
+        # Written to a temporary file and renamed, so a scrape never sees half a file
+        path = path or self.prom_path
+        if not path:
+            return
+        self._dirty = False
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+                f.write(self.prometheus())
+            os.replace(f'{path}.tmp', path)
+        except OSError as e:
+            log.warning("Could not write metrics to %s: %s", path, e)
+
+    def _add(self, name, value, labels):
+        # Called with the lock held
+        key = (name, tuple(sorted(labels.items())))
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def _write_event(self, event):
+        # Called with the lock held; metrics must never fail a job
+        try:
+            if self._log_file is None:
+                os.makedirs(os.path.dirname(self.log_path) or '.', exist_ok=True)
+                self._log_file = open(self.log_path, 'a', buffering=1, encoding='utf-8')
+            self._log_file.write(json.dumps(event) + '\n')
+        except OSError as e:
+            log.warning("Could not write metrics to %s: %s", self.log_path, e)
+            self.log_path = None
+
+    def _changed(self):
+        self._dirty = True
+        if self.prom_path and self._writer is None:
+            with self._lock:
+                if self._writer is not None:
+                    return
+                self._writer = threading.Thread(target=self._write_periodically, name='metrics', daemon=True)
+                self._writer.start()
+            atexit.register(self.write_prometheus)
+
+    def _write_periodically(self):
+        while True:
+            if self._dirty:
+                self.write_prometheus()
+            time.sleep(self.interval)
+
+
+metrics = Metrics()
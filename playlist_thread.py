@@ -0,0 +1,26 @@
+from PyQt6.QtCore import QThread, pyqtSignal
+import engine
+
+class PlaylistExpanderThread(QThread):
+    entry_found = pyqtSignal(str, str)  # video URL, title
+    expansion_finished = pyqtSignal(int)  # number of entries queued
+    error_signal = pyqtSignal(str)
+
+    def __init__(self, url, download_queue):
+        super().__init__()
+        self.url = url
+        self.download_queue = download_queue
+
+    def run(self):
+        count = 0
+        try:
+            for url, title in engine.iter_playlist_entries(self.url, self.isInterruptionRequested):
+                # Blocks while the queue already holds PLAYLIST_QUEUE_AHEAD of our entries
+                if not self.download_queue.acquire_slot(self.isInterruptionRequested):
+                    break
+                self.entry_found.emit(url, title)
+                count += 1
+        except Exception as e:
+            self.error_signal.emit(f"Error expanding playlist: {e}")
+        finally:
+            self.expansion_finished.emit(count)
@@ -0,0 +1,95 @@
+import math
+import threading
+import time
+
+import config
+
+
+def format_bytes(count):
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if abs(count) < 1024 or unit == 'GiB':
+            return f"{count:.0f} {unit}" if unit == 'B' else f"{count:.1f} {unit}"
+        count /= 1024
+
+
+def format_speed(bytes_per_second):
+    return f"{format_bytes(bytes_per_second or 0)}/s"
+
+
+def format_eta(seconds):
+    if seconds is None:
+        return "-"
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+class _Sample:
+    __slots__ = ('first_bytes', 'bytes', 'time', 'emitted_at', 'speed')
+
+    def __init__(self, now):
+        self.first_bytes = 0
+        self.bytes = 0
+        self.time = now
+        self.emitted_at = None
+        self.speed = 0.0
+
+
+class ProgressAggregator:
+    # Turns yt-dlp progress callbacks into per-job percent, smoothed speed and ETA.
+    # update() is O(1) and tells the caller whether the job is due for a (throttled)
+    # UI update, so the cost of reporting doesn't grow with the link speed.
+
+    def __init__(self, interval=config.PROGRESS_INTERVAL, smoothing=config.PROGRESS_SMOOTHING):
+        self.interval = interval
+        self.smoothing = smoothing
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def update(self, job, progress):
+        downloaded = progress.get('downloaded_bytes')
+        if downloaded is None:
+            return False
+        # Fragmented and some HTTP downloads only know an estimated size
+        total = progress.get('total_bytes') or progress.get('total_bytes_estimate')
+        now = time.monotonic()
+
+        with self._lock:
+            sample = self._samples.get(job.job_id)
+            if sample is None:
+                sample = self._samples[job.job_id] = _Sample(now)
+                # A resumed download starts counting at the size of its .part file
+                sample.first_bytes = sample.bytes = downloaded
+            elapsed = now - sample.time
+            if elapsed > 0:
+                # Exponential moving average weighted by elapsed time, independent of callback rate
+                weight = 1 - math.exp(-elapsed / self.smoothing) if self.smoothing > 0 else 1
+                rate = max(downloaded - sample.bytes, 0) / elapsed
+                sample.speed += weight * (rate - sample.speed)
+                sample.bytes = downloaded
+                sample.time = now
+
+            job.downloaded_bytes = downloaded
+            job.total_bytes = total
+            job.speed = sample.speed
+            if total:
+                job.progress = min(int(downloaded / total * 100), 100)
+                job.eta = (total - downloaded) / sample.speed if sample.speed > 0 else None
+
+            if sample.emitted_at is None or now - sample.emitted_at >= self.interval:
+                sample.emitted_at = now
+                return True
+            return False
+
+    def finish(self, job):
+        # Returns the number of bytes this download received
+        with self._lock:
+            sample = self._samples.pop(job.job_id, None)
+        job.speed = 0.0
+        job.eta = None
+        return max(sample.bytes - sample.first_bytes, 0) if sample is not None else 0
+
+    def total_speed(self):
+        with self._lock:
+            return sum(sample.speed for sample in self._samples.values())
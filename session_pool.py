@@ -0,0 +1,142 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import config
+
+# Long-lived YoutubeDL instances, so HTTP keep-alive connections, cookies, TLS
+# sessions and loaded extractors carry over from one lookup or download to the
+# next. A session is used by one thread at a time; sessions are grouped by
+# their options, per-use settings (format, output template, progress hook) are
+# applied when one is checked out.
+
+
+class Session:
+    def __init__(self, opts, generation):
+        from yt_dlp import YoutubeDL
+        self.progress_hook = None
+        self.cancelled = None
+        self.ydl = YoutubeDL({**opts, 'progress_hooks': [self._on_progress]})
+        # Every request of an extraction or a download goes through urlopen, so a
+        # cancelled lookup or job stops before its next network round trip
+        self._urlopen = self.ydl.urlopen
+        self.ydl.urlopen = self._checked_urlopen
+        self.generation = generation
+        self.created_at = time.monotonic()
+        self.uses = 0
+        self._default_selector = self.ydl.format_selector
+        self._default_outtmpl = self.ydl.params['outtmpl']['default']
+        self._selectors = {}
+
+    def prepare(self, format=None, outtmpl=None, progress_hook=None, cancelled=None):
+        if format is None:
+            self.ydl.format_selector = self._default_selector
+        else:
+            if format not in self._selectors:
+                self._selectors[format] = self.ydl.build_format_selector(format)
+            self.ydl.format_selector = self._selectors[format]
+        self.ydl.params['outtmpl']['default'] = outtmpl or self._default_outtmpl
+        self.progress_hook = progress_hook
+        self.cancelled = cancelled
+        self.uses += 1
+
+    def _checked_urlopen(self, request):
+        if self.cancelled is not None and self.cancelled():
+            from yt_dlp.utils import DownloadCancelled
+            raise DownloadCancelled("Cancelled")
+        return self._urlopen(request)
+
+    def _on_progress(self, progress):
+        if self.progress_hook is not None:
+            self.progress_hook(progress)
+
+    def close(self):
+        try:
+            self.ydl.close()
+        except Exception:
+            pass
+
+
+class SessionPool:
+    def __init__(self, max_sessions=config.SESSION_POOL_SIZE, max_uses=config.SESSION_MAX_USES,
+                 max_age=config.SESSION_MAX_AGE):
+        self.max_sessions = max_sessions
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self._idle = {}  # options key -> sessions, most recently used last
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def session(self, opts, format=None, outtmpl=None, progress_hook=None, cancelled=None):
+        # Yields a YoutubeDL for the calling thread's exclusive use. A session
+        # whose block raised may be in a bad state and is closed, not reused.
+        # Once cancelled() returns true, its next request raises DownloadCancelled.
+        key = repr(sorted(opts.items()))
+        session = self._checkout(key)
+        if session is None:
+            session = Session(opts, self._generation)
+        session.prepare(format, outtmpl, progress_hook, cancelled)
+        try:
+            yield session.ydl
+        except GeneratorExit:
+            # A playlist iterator that wasn't read to the end
+            self._checkin(key, session)
+            raise
+        except BaseException:
+            session.close()
+            raise
+        else:
+            self._checkin(key, session)
+
+    def clear(self):
+        # Drops every session, including ones in use once they come back; used
+        # when cached player code went stale and extractors must start over
+        with self._lock:
+            self._generation += 1
+            idle = [session for sessions in self._idle.values() for session in sessions]
+            self._idle.clear()
+        for session in idle:
+            session.close()
+
+    def _checkout(self, key):
+        expired = []
+        with self._lock:
+            sessions = self._idle.get(key, [])
+            found = None
+            while sessions and found is None:
+                session = sessions.pop()
+                if self._healthy(session):
+                    found = session
+                else:
+                    expired.append(session)
+        for session in expired:
+            session.close()
+        return found
+
+    def _checkin(self, key, session):
+        session.progress_hook = None
+        session.cancelled = None
+        evicted = None
+        with self._lock:
+            if self._healthy(session):
+                self._idle.setdefault(key, []).append(session)
+                if sum(len(sessions) for sessions in self._idle.values()) > self.max_sessions:
+                    evicted = self._oldest_idle()
+            else:
+                evicted = session
+        if evicted is not None:
+            evicted.close()
+
+    def _healthy(self, session):
+        return (session.generation == self._generation and session.uses < self.max_uses
+                and time.monotonic() - session.created_at < self.max_age)
+
+    def _oldest_idle(self):
+        # Called with the lock held, removes and returns the least recently created idle session
+        key, sessions = min(((key, sessions) for key, sessions in self._idle.items() if sessions),
+                            key=lambda item: item[1][0].created_at)
+        return sessions.pop(0)
+
+
+session_pool = SessionPool()
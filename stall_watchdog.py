@@ -0,0 +1,59 @@
+import logging
+import sys
+import threading
+import time
+import traceback
+
+import config
+from metrics import metrics
+
+# Catches freezes of the GUI. The event loop calls beat() from a timer every
+# interval seconds; a background thread notices when the beats stop for longer
+# than the threshold and logs where the main thread is stuck while the stall is
+# still going on. Every stall is counted in the metrics (ui_stalls and
+# ui_stall_seconds), so freezes show up as numbers instead of user reports.
+
+log = logging.getLogger(__name__)
+
+
+class StallWatchdog:
+    def __init__(self, threshold=config.STALL_THRESHOLD, interval=config.STALL_INTERVAL):
+        self.threshold = threshold
+        self.interval = interval
+        self.max_latency = 0.0  # worst event loop latency seen, seconds
+        self._main_thread_id = threading.main_thread().ident
+        self._last_beat = time.monotonic()
+        self._sampled = False  # a stack was logged for the stall going on
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._last_beat = time.monotonic()
+        self._thread = threading.Thread(target=self._watch, name='stall-watchdog', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def beat(self):
+        # Called on the GUI thread. The time since the last beat beyond the timer
+        # interval is how long queued events had to wait.
+        now = time.monotonic()
+        latency = max(now - self._last_beat - self.interval, 0.0)
+        self._last_beat = now
+        self.max_latency = max(self.max_latency, latency)
+        if latency > self.threshold:
+            log.warning("Event loop stalled for %.0f ms", latency * 1000)
+            metrics.count('ui_stalls')
+            metrics.count('ui_stall_seconds', latency)
+        self._sampled = False
+
+    def _watch(self):
+        while not self._stopped.wait(self.threshold / 2):
+            stalled_for = time.monotonic() - self._last_beat - self.interval
+            if stalled_for > self.threshold and not self._sampled:
+                self._sampled = True
+                frame = sys._current_frames().get(self._main_thread_id)
+                stack = ''.join(traceback.format_stack(frame)) if frame is not None else "(no stack)\n"
+                log.warning("Event loop blocked for %.0f ms so far, main thread at:\n%s",
+                            stalled_for * 1000, stack.rstrip())
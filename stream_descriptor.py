@@ -0,0 +1,39 @@
+import time
+
+import config
+from metadata_store import format_expiry
+
+# What picking and downloading a stream needs from a yt-dlp format dict. The full
+# dicts carry HTTP headers, fragment lists and signed URLs; they stay in the
+# metadata cache and store, found again through key, instead of being copied
+# into every combo box entry and job.
+
+
+class StreamDescriptor:
+    __slots__ = ('format_id', 'acodec', 'abr', 'size', 'expires_at', 'key')
+
+    def __init__(self, format_id, acodec, abr, size, expires_at, key):
+        self.format_id = format_id
+        self.acodec = acodec
+        self.abr = abr  # kbps, as yt-dlp reports it
+        self.size = size  # bytes, exact or approximate, None if unknown
+        self.expires_at = expires_at  # unix time the signed stream URL stops working
+        self.key = key  # metadata cache key of the video the stream belongs to
+
+    @classmethod
+    def from_format(cls, stream, key, fetched_at=None):
+        if fetched_at is None:
+            fetched_at = time.time()
+        return cls(str(stream['format_id']), stream.get('acodec'), stream.get('abr'),
+                   stream.get('filesize') or stream.get('filesize_approx'), format_expiry(stream, fetched_at), key)
+
+    def expired(self):
+        return self.expires_at - config.FORMAT_URL_MARGIN <= time.time()
+
+    def info(self):
+        # The full info dict, or None once the cache and the store have dropped it
+        from metadata_cache import metadata_cache
+        return metadata_cache.get(self.key, allow_stale=True)
+
+    def __repr__(self):
+        return f'StreamDescriptor({self.format_id!r}, {self.acodec!r}, {self.abr!r} kbps, key={self.key!r})'
@@ -0,0 +1,174 @@
+import logging
+import os
+import queue
+import subprocess
+import threading
+
+import config
+from format_select import COPY, conversion
+from metrics import metrics
+
+# Same encoder settings FFmpegExtractAudio used with preferredquality '192'
+CODEC_ARGS = {
+    'mp3': ['-c:a', 'libmp3lame', '-b:a', '192k'],
+    'm4a': ['-c:a', 'aac', '-b:a', '192k'],
+    'opus': ['-c:a', 'libopus', '-b:a', '160k'],
+    'wav': ['-c:a', 'pcm_s16le'],
+    'flac': ['-c:a', 'flac'],
+}
+COPY_ARGS = ['-c:a', 'copy']
+# How often a running ffmpeg checks whether its job was cancelled, seconds
+CANCEL_POLL = 0.2
+
+log = logging.getLogger(__name__)
+
+
+class TranscodeError(Exception):
+    pass
+
+
+class TranscodeCancelled(TranscodeError):
+    pass
+
+
+def ffmpeg_command(source, targets, source_codec=None):
+    # targets is a list of (path, codec). A single ffmpeg run decodes the source once
+    # and feeds every encoder, one output file per target. Targets in the source's
+    # codec are stream copied (remuxed) instead of re-encoded.
+    command = [config.FFMPEG, '-y', '-nostdin', '-loglevel', 'error', '-i', source]
+    for target, codec in targets:
+        if codec not in CODEC_ARGS:
+            raise TranscodeError(f"Unsupported file type: {codec}")
+        args = COPY_ARGS if conversion(source_codec, codec) == COPY else CODEC_ARGS[codec]
+        command += ['-map', '0:a:0', '-vn', *args, target]
+    return command
+
+
+def renamed_target(source, targets, source_codec):
+    # A target in the source's codec and container is the source file itself
+    extension = os.path.splitext(source)[1].lstrip('.')
+    for target, codec in targets:
+        if codec == extension and conversion(source_codec, codec) == COPY:
+            return target, codec
+    return None
+
+
+def transcode(source, targets, source_codec=None, job=None, cancelled=lambda: False):
+    renamed = renamed_target(source, targets, source_codec)
+    remaining = [target for target in targets if target != renamed]
+    if remaining:
+        with metrics.span('postprocess', job):
+            returncode, stderr = run_ffmpeg(ffmpeg_command(source, remaining, source_codec), cancelled)
+            if returncode != 0 or cancelled():
+                _remove(remaining)
+                if cancelled():
+                    raise TranscodeCancelled("Conversion cancelled")
+                raise TranscodeError(stderr.strip() or f"ffmpeg exited with status {returncode}")
+    if renamed:
+        # Runs last, the other targets are read from the source
+        os.replace(source, renamed[0])
+
+
+def transcode_stream(blocks, targets, source_codec=None):
+    # Streaming mode: the source arrives as an iterable of byte blocks and is piped
+    # into ffmpeg, so only the targets are written. A write waits while ffmpeg is
+    # busy, which paces the download to the encoder. Whatever reading the blocks
+    # raises (a cancelled or failed download) is raised after the partial targets
+    # are removed.
+    process = subprocess.Popen(ffmpeg_command('pipe:0', targets, source_codec), stdin=subprocess.PIPE,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    # Read alongside, a full stderr pipe would stall ffmpeg and with it the writes
+    errors = []
+    reader = threading.Thread(target=lambda: errors.append(process.stderr.read()), daemon=True)
+    reader.start()
+    try:
+        try:
+            for block in blocks:
+                process.stdin.write(block)
+            process.stdin.close()
+        except BrokenPipeError:
+            pass  # ffmpeg gave up, its error output says why
+        returncode = process.wait()
+    except BaseException:
+        process.kill()
+        process.wait()
+        _remove(targets)
+        raise
+    reader.join()
+    if returncode != 0:
+        _remove(targets)
+        stderr = errors[0].decode(errors='replace') if errors else ''
+        raise TranscodeError(stderr.strip() or f"ffmpeg exited with status {returncode}")
+
+
+def _remove(targets):
+    for target, codec in targets:
+        if os.path.exists(target):
+            os.remove(target)
+
+
+def run_ffmpeg(command, cancelled):
+    # Like subprocess.run, but ffmpeg is terminated as soon as cancelled() returns true
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    while True:
+        try:
+            _, stderr = process.communicate(timeout=CANCEL_POLL)
+            return process.returncode, stderr
+        except subprocess.TimeoutExpired:
+            if cancelled():
+                break
+    process.terminate()
+    try:
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+    # Its error output doesn't matter any more, and reading it could wait on a stuck pipe
+    process.stderr.close()
+    return process.returncode, ''
+
+
+class TranscodeStage:
+    def __init__(self, workers=config.TRANSCODE_WORKERS, queue_size=config.TRANSCODE_QUEUE_SIZE):
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._threads = []
+        for index in range(workers):
+            # Each thread drives one ffmpeg child process at a time
+            thread = threading.Thread(target=self._run, name=f'transcode-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, source, targets, on_done, source_codec=None, job=None):
+        # Blocks the calling download worker while the queue is full (backpressure).
+        # on_done(error) is called from a transcode thread, error is None on success.
+        self._queue.put((source, targets, source_codec, job, on_done))
+
+    def shutdown(self, wait=True):
+        for _ in self._threads:
+            self._queue.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _run(self):
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+            source, targets, source_codec, job, on_done = task
+            cancelled = (lambda job=job: job.stop_reason is not None) if job is not None else (lambda: False)
+            try:
+                if cancelled():
+                    raise TranscodeCancelled("Conversion cancelled")  # while waiting in the queue
+                transcode(source, targets, source_codec, job, cancelled)
+                if os.path.exists(source):
+                    os.remove(source)
+            except Exception as e:
+                error = e
+            else:
+                error = None
+            # A failing callback must not take this thread, and a share of the pool, with it
+            try:
+                on_done(error)
+            except Exception:
+                log.exception("Error finishing the conversion of %s", source)
@@ -0,0 +1,161 @@
+# Form implementation generated from reading ui file 'main.ui'
+#
+# Created by: PyQt6 UI code generator 6.11.0
+#
+# WARNING: Any manual changes made to this file will be lost when pyuic6 is
+# run again.  Do not edit this file unless you know what you are doing.
+
+
+from PyQt6 import QtCore, QtGui, QtWidgets
+
+
+class Ui_MainWindow(object):
+    def setupUi(self, MainWindow):
+        MainWindow.setObjectName("MainWindow")
+        MainWindow.resize(813, 540)
+        self.centralwidget = QtWidgets.QWidget(parent=MainWindow)
+        self.centralwidget.setObjectName("centralwidget")
+        self.search_url_button = QtWidgets.QPushButton(parent=self.centralwidget)
+        self.search_url_button.setGeometry(QtCore.QRect(310, 90, 181, 31))
+        self.search_url_button.setObjectName("search_url_button")
+        self.save_path_button = QtWidgets.QPushButton(parent=self.centralwidget)
+        self.save_path_button.setGeometry(QtCore.QRect(100, 130, 181, 31))
+        self.save_path_button.setObjectName("save_path_button")
+        self.video_url_label = QtWidgets.QLabel(parent=self.centralwidget)
+        self.video_url_label.setGeometry(QtCore.QRect(100, 60, 171, 21))
+        self.video_url_label.setObjectName("video_url_label")
+        self.selected_path = QtWidgets.QLabel(parent=self.centralwidget)
+        self.selected_path.setGeometry(QtCore.QRect(100, 230, 91, 18))
+        self.selected_path.setObjectName("selected_path")
+        self.selected_path_text = QtWidgets.QLabel(parent=self.centralwidget)
+        self.selected_path_text.setGeometry(QtCore.QRect(100, 250, 241, 16))
+        self.selected_path_text.setObjectName("selected_path_text")
+        self.select_quality_combobox = QtWidgets.QComboBox(parent=self.centralwidget)
+        self.select_quality_combobox.setGeometry(QtCore.QRect(100, 190, 181, 31))
+        self.select_quality_combobox.setObjectName("select_quality_combobox")
+        self.select_quality_label = QtWidgets.QLabel(parent=self.centralwidget)
+        self.select_quality_label.setGeometry(QtCore.QRect(100, 170, 91, 18))
+        self.select_quality_label.setObjectName("select_quality_label")
+        self.save_filetype_label = QtWidgets.QLabel(parent=self.centralwidget)
+        self.save_filetype_label.setGeometry(QtCore.QRect(310, 170, 101, 18))
+        self.save_filetype_label.setObjectName("save_filetype_label")
+        self.save_filetype_combobox = QtWidgets.QComboBox(parent=self.centralwidget)
+        self.save_filetype_combobox.setGeometry(QtCore.QRect(310, 190, 181, 31))
+        self.save_filetype_combobox.setObjectName("save_filetype_combobox")
+        self.selected_quality = QtWidgets.QLabel(parent=self.centralwidget)
+        self.selected_quality.setGeometry(QtCore.QRect(520, 180, 111, 18))
+        self.selected_quality.setObjectName("selected_quality")
+        self.selected_quality_text = QtWidgets.QLabel(parent=self.centralwidget)
+        self.selected_quality_text.setGeometry(QtCore.QRect(520, 200, 111, 18))
+        self.selected_quality_text.setObjectName("selected_quality_text")
+        self.selected_filetype = QtWidgets.QLabel(parent=self.centralwidget)
+        self.selected_filetype.setGeometry(QtCore.QRect(520, 230, 58, 18))
+        self.selected_filetype.setObjectName("selected_filetype")
+        self.selected_filetype_text = QtWidgets.QLabel(parent=self.centralwidget)
+        self.selected_filetype_text.setGeometry(QtCore.QRect(520, 250, 71, 18))
+        self.selected_filetype_text.setObjectName("selected_filetype_text")
+        self.check_show_name = QtWidgets.QCheckBox(parent=self.centralwidget)
+        self.check_show_name.setGeometry(QtCore.QRect(520, 20, 101, 22))
+        self.check_show_name.setObjectName("check_show_name")
+        self.operation = QtWidgets.QLabel(parent=self.centralwidget)
+        self.operation.setGeometry(QtCore.QRect(650, 180, 81, 18))
+        self.operation.setObjectName("operation")
+        self.operation_text = QtWidgets.QLabel(parent=self.centralwidget)
+        self.operation_text.setGeometry(QtCore.QRect(650, 200, 91, 18))
+        self.operation_text.setObjectName("operation_text")
+        self.status = QtWidgets.QLabel(parent=self.centralwidget)
+        self.status.setGeometry(QtCore.QRect(650, 230, 58, 18))
+        self.status.setObjectName("status")
+        self.status_text = QtWidgets.QLabel(parent=self.centralwidget)
+        self.status_text.setGeometry(QtCore.QRect(650, 250, 71, 18))
+        self.status_text.setObjectName("status_text")
+        self.video_name = QtWidgets.QLabel(parent=self.centralwidget)
+        self.video_name.setGeometry(QtCore.QRect(520, 90, 91, 18))
+        self.video_name.setObjectName("video_name")
+        self.video_name_text = QtWidgets.QLabel(parent=self.centralwidget)
+        self.video_name_text.setGeometry(QtCore.QRect(520, 110, 161, 41))
+        self.video_name_text.setLineWidth(2)
+        self.video_name_text.setObjectName("video_name_text")
+        self.open_file_path = QtWidgets.QPushButton(parent=self.centralwidget)
+        self.open_file_path.setGeometry(QtCore.QRect(310, 130, 181, 31))
+        self.open_file_path.setObjectName("open_file_path")
+        self.jobs_table = QtWidgets.QTableWidget(parent=self.centralwidget)
+        self.jobs_table.setGeometry(QtCore.QRect(100, 300, 621, 151))
+        self.jobs_table.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.jobs_table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectionBehavior.SelectRows)
+        self.jobs_table.setObjectName("jobs_table")
+        self.jobs_table.setColumnCount(8)
+        self.jobs_table.setRowCount(0)
+        item = QtWidgets.QTableWidgetItem()
+        self.jobs_table.setHorizontalHeaderItem(0, item)
+        item = QtWidgets.QTableWidgetItem()
+        self.jobs_table.setHorizontalHeaderItem(1, item)
+        item = QtWidgets.QTableWidgetItem()
+        self.jobs_table.setHorizontalHeaderItem(2, item)
+        item = QtWidgets.QTableWidgetItem()
+        self.jobs_table.setHorizontalHeaderItem(3, item)
+        item = QtWidgets.QTableWidgetItem()
+        self.jobs_table.setHorizontalHeaderItem(4, item)
+        item = QtWidgets.QTableWidgetItem()
+        self.jobs_table.setHorizontalHeaderItem(5, item)
+        item = QtWidgets.QTableWidgetItem()
+        self.jobs_table.setHorizontalHeaderItem(6, item)
+        item = QtWidgets.QTableWidgetItem()
+        self.jobs_table.setHorizontalHeaderItem(7, item)
+        self.download_progress_label = QtWidgets.QLabel(parent=self.centralwidget)
+        self.download_progress_label.setGeometry(QtCore.QRect(100, 280, 121, 18))
+        self.download_progress_label.setObjectName("download_progress_label")
+        self.url_input = QtWidgets.QTextEdit(parent=self.centralwidget)
+        self.url_input.setGeometry(QtCore.QRect(100, 90, 181, 31))
+        self.url_input.setObjectName("url_input")
+        self.start_download = QtWidgets.QPushButton(parent=self.centralwidget)
+        self.start_download.setGeometry(QtCore.QRect(340, 460, 131, 41))
+        self.start_download.setObjectName("start_download")
+        MainWindow.setCentralWidget(self.centralwidget)
+        self.statusbar = QtWidgets.QStatusBar(parent=MainWindow)
+        self.statusbar.setObjectName("statusbar")
+        MainWindow.setStatusBar(self.statusbar)
+
+        self.retranslateUi(MainWindow)
+        QtCore.QMetaObject.connectSlotsByName(MainWindow)
+
+    def retranslateUi(self, MainWindow):
+        _translate = QtCore.QCoreApplication.translate
+        MainWindow.setWindowTitle(_translate("MainWindow", "MainWindow"))
+        self.search_url_button.setText(_translate("MainWindow", "Search For URL"))
+        self.save_path_button.setText(_translate("MainWindow", "Choose Save PATH"))
+        self.video_url_label.setText(_translate("MainWindow", "Enter Video URL"))
+        self.selected_path.setText(_translate("MainWindow", "Selected PATH"))
+        self.selected_path_text.setText(_translate("MainWindow", "None"))
+        self.select_quality_label.setText(_translate("MainWindow", "Select Quality"))
+        self.save_filetype_label.setText(_translate("MainWindow", "Save File Type"))
+        self.selected_quality.setText(_translate("MainWindow", "Selected Quality"))
+        self.selected_quality_text.setText(_translate("MainWindow", "None"))
+        self.selected_filetype.setText(_translate("MainWindow", "File Type"))
+        self.selected_filetype_text.setText(_translate("MainWindow", "None"))
+        self.check_show_name.setText(_translate("MainWindow", "Show Name"))
+        self.operation.setText(_translate("MainWindow", "Operation"))
+        self.operation_text.setText(_translate("MainWindow", "None"))
+        self.status.setText(_translate("MainWindow", "Status"))
+        self.status_text.setText(_translate("MainWindow", "Non-Ready"))
+        self.video_name.setText(_translate("MainWindow", "Video Name"))
+        self.video_name_text.setText(_translate("MainWindow", "None"))
+        self.open_file_path.setText(_translate("MainWindow", "Open Save PATH"))
+        item = self.jobs_table.horizontalHeaderItem(0)
+        item.setText(_translate("MainWindow", "ID"))
+        item = self.jobs_table.horizontalHeaderItem(1)
+        item.setText(_translate("MainWindow", "Title"))
+        item = self.jobs_table.horizontalHeaderItem(2)
+        item.setText(_translate("MainWindow", "Quality"))
+        item = self.jobs_table.horizontalHeaderItem(3)
+        item.setText(_translate("MainWindow", "Type"))
+        item = self.jobs_table.horizontalHeaderItem(4)
+        item.setText(_translate("MainWindow", "State"))
+        item = self.jobs_table.horizontalHeaderItem(5)
+        item.setText(_translate("MainWindow", "Progress"))
+        item = self.jobs_table.horizontalHeaderItem(6)
+        item.setText(_translate("MainWindow", "Speed"))
+        item = self.jobs_table.horizontalHeaderItem(7)
+        item.setText(_translate("MainWindow", "ETA"))
+        self.download_progress_label.setText(_translate("MainWindow", "Downloads"))
+        self.start_download.setText(_translate("MainWindow", "Start"))
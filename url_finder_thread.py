@@ -1,30 +1,54 @@
+import logging
 from PyQt6.QtCore import QThread, pyqtSignal
-from yt_dlp import YoutubeDL
+import engine
+
+log = logging.getLogger(__name__)
 
 class URLFinderThread(QThread):
-    found_url = pyqtSignal(bool)
+    found_url = pyqtSignal(object)  # info dict, or None if the lookup failed
+    found_playlist = pyqtSignal(object)  # {'webpage_url', 'id', 'title'}; entries are expanded later
+    status = pyqtSignal(str)  # status bar text; widgets are only touched on the GUI thread
+    # Several URLs: one signal per URL as its lookup finishes
+    resolved = pyqtSignal(str, object)  # URL, info dict (a video or a playlist summary)
+    resolve_failed = pyqtSignal(str, str)  # URL, error message
 
-    def __init__(self, url_input, status_bar):
+    def __init__(self, urls):
         super().__init__()
-        self.url_input = url_input
-        self.status_bar = status_bar
+        self.urls = urls
+        self.info = None
 
     def run(self):
-        url = self.url_input.toPlainText().strip()
-        if not url:
-            self.status_bar.showMessage("Please enter a YouTube URL")
-            self.found_url.emit(False)
+        if len(self.urls) > 1:
+            self.resolve_all()
             return
 
-        self.ydl_opts = {'quiet': True, 'socket_timeout': 15}
-        self.ydl = YoutubeDL(self.ydl_opts)
-        self.info = None
+        from yt_dlp.utils import DownloadCancelled, DownloadError
+
+        if not self.urls:
+            self.status.emit("Please enter a YouTube URL")
+            self.found_url.emit(None)
+            return
+        url = self.urls[0]
+
         try:
-            self.status_bar.showMessage("Waiting for yt-dlp response...")  # New message when yt-dlp starts
-            self.info = self.ydl.extract_info(url, download=False)
-        except YoutubeDL.utils.DownloadError as e:
-            print(f"Download error: {e}")
-        except Exception as e:
-            print(f"Unexpected error: {e}")
-        finally:
-            self.found_url.emit(self.info is not None)
+            self.status.emit("Waiting for yt-dlp response...")  # New message when yt-dlp starts
+            info = engine.resolve(url, self.isInterruptionRequested)
+            if engine.is_playlist(info):
+                self.found_playlist.emit(info)
+                return
+            self.info = info
+        except DownloadCancelled:
+            return  # a newer lookup replaced this one
+        except DownloadError as e:
+            log.warning("Download error: %s", e)
+        except Exception:
+            log.exception("Unexpected error looking up %s", url)
+        self.found_url.emit(self.info)
+
+    def resolve_all(self):
+        for url, info, error in engine.resolve_many(self.urls, cancelled=self.isInterruptionRequested):
+            if error is None:
+                self.resolved.emit(url, info)
+            else:
+                log.warning("Could not resolve %s: %s", url, error)
+                self.resolve_failed.emit(url, str(error))
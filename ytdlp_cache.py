@@ -0,0 +1,73 @@
+import os
+import shutil
+import time
+
+import config
+
+# Sections yt-dlp fills with solved player JavaScript; stale entries there cause
+# signature errors until they are dropped
+PLAYER_SECTIONS = ('youtube-sigfuncs', 'youtube-nsig', 'youtube-player')
+
+
+class YtdlpCache:
+    def __init__(self, path=config.YTDLP_CACHE_DIR, max_bytes=config.YTDLP_CACHE_MAX_MB * 1024 * 1024,
+                 max_age=config.YTDLP_CACHE_MAX_AGE):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+    def _files(self):
+        files = []
+        for root, _, names in os.walk(self.path):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def size(self):
+        return sum(size for _, size, _ in self._files())
+
+    def prune(self):
+        # Drops entries older than max_age, then the oldest ones until the cache fits max_bytes
+        now = time.time()
+        kept = []
+        removed = 0
+        for mtime, size, path in self._files():
+            if now - mtime > self.max_age:
+                removed += self._remove(path)
+            else:
+                kept.append((mtime, size, path))
+
+        total = sum(size for _, size, _ in kept)
+        for mtime, size, path in sorted(kept):
+            if total <= self.max_bytes:
+                break
+            removed += self._remove(path)
+            total -= size
+        return removed
+
+    def invalidate(self, sections=None):
+        # Without sections the whole cache is cleared
+        if sections is None:
+            shutil.rmtree(self.path, ignore_errors=True)
+            return
+        for section in sections:
+            shutil.rmtree(os.path.join(self.path, section), ignore_errors=True)
+
+    def invalidate_player(self):
+        self.invalidate(PLAYER_SECTIONS)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return 1
+        except OSError:
+            return 0
+
+
+ytdlp_cache = YtdlpCache()